@@ -0,0 +1,106 @@
+"""Response cache and conditional GET support for the read API
+
+Read endpoints are keyed on a data version: the newest signal and security
+log ids, the database's count of in-place signal edits, plus a generation
+bumped by any other change event (such as SIGNAL_UPDATED). Events published
+in this process move the version immediately; writes from the other process
+(the Bot.py worker) are noticed by re-reading the newest ids and the edit
+count at most once every REVALIDATE_SECONDS.
+
+While the version is unchanged, a poll carrying the current ETag gets a 304
+without touching SQLite, and any other request is served from the cached
+JSON body, stored both plain and gzip-compressed.
+"""
+import os
+import gzip
+import json
+import math
+import time
+import threading
+from collections import OrderedDict
+
+from events import bus, SIGNAL_SAVED, SIGNAL_UPDATED, SECURITY_LOGGED
+
+REVALIDATE_SECONDS = float(os.getenv('API_CACHE_REVALIDATE_SECONDS', '1'))
+MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', '256'))
+MIN_GZIP_SIZE = 512
+
+
+class ResponseCache:
+    """Versioned JSON bodies for the read endpoints, newest keys kept"""
+
+    def __init__(self, read_latest_ids, revalidate_seconds=REVALIDATE_SECONDS, max_entries=MAX_ENTRIES):
+        self._read_latest_ids = read_latest_ids
+        self.revalidate_seconds = revalidate_seconds
+        self.max_entries = max_entries
+        # Newest ids and change count seen in events, folded in by version()
+        self._seen = (0, 0, 0)
+        self._seen_lock = threading.Lock()
+        bus.listen(self._on_event, SIGNAL_SAVED, SIGNAL_UPDATED, SECURITY_LOGGED)
+        self._lock = threading.Lock()
+        self._signal_id = 0
+        self._log_id = 0
+        self._edits = 0
+        self._generation = 0
+        self._checked_at = 0.0
+        # Whole epoch seconds, as sent in Last-Modified
+        self.last_modified = math.ceil(time.time())
+        self._entries = OrderedDict()
+
+    def _on_event(self, topic, event):
+        # Runs on the publishing thread (the group-commit writer): no I/O here
+        with self._seen_lock:
+            signal_id, log_id, changes = self._seen
+            if topic == SIGNAL_SAVED:
+                signal_id = max(signal_id, event['id'])
+            elif topic == SECURITY_LOGGED:
+                log_id = max(log_id, event['id'])
+            else:
+                changes += 1
+            self._seen = (signal_id, log_id, changes)
+
+    def version(self):
+        """Current (signal id, log id, edits, generation), cheap when nothing changed"""
+        with self._lock:
+            with self._seen_lock:
+                seen_signal_id, seen_log_id, generation = self._seen
+            signal_id, log_id, edits = (max(self._signal_id, seen_signal_id), max(self._log_id, seen_log_id),
+                                        self._edits)
+
+            now = time.monotonic()
+            if now - self._checked_at >= self.revalidate_seconds:
+                self._checked_at = now
+                latest_signal_id, latest_log_id, edits = self._read_latest_ids()
+                signal_id = max(signal_id, latest_signal_id)
+                log_id = max(log_id, latest_log_id)
+
+            version = (signal_id, log_id, edits, generation)
+            if version != (self._signal_id, self._log_id, self._edits, self._generation):
+                self._signal_id, self._log_id, self._edits, self._generation = version
+                # Rounded up, and never reused for a second change in the same second,
+                # so a client holding an older Last-Modified always sees it move
+                self.last_modified = max(math.ceil(time.time()), self.last_modified + 1)
+            return version
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, data):
+        body = json.dumps(data).encode()
+        gzipped = gzip.compress(body, compresslevel=6) if len(body) >= MIN_GZIP_SIZE else None
+        entry = (version, body, gzipped)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def make_etag(version):
+    return '-'.join(str(part) for part in version)
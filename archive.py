@@ -0,0 +1,351 @@
+"""Retention and compaction for signals.db
+
+    python archive.py [--db signals.db] [--archive-dir archive] [--retain-days 90]
+                      [--log-retain-days 90] [--chunk-size 1000] [--pause-ms 20]
+    python archive.py --compact [--vacuum-pages 1000]
+    python archive.py --enable-incremental-vacuum
+
+Without a mode flag, signals older than retain_days move to one SQLite file
+per month in archive_dir (signals_archive_YYYY_MM.db, by created_at in UTC)
+along with their performance rows and message texts; security logs older
+than log_retain_days go to the same monthly files by their timestamp. Each
+chunk is one short write transaction with the partition ATTACHed, sleeping
+between chunks so the live bot and web process can get the write lock.
+Rows are copied with INSERT OR IGNORE before they are deleted, so an
+interrupted run is safe to repeat. Run --compact first on a database from
+before schema v6, so that archived rows carry packed text too. A partition
+has the hot tables' schema, and can be opened with sqlite3 or pointed at
+with SIGNALS_DB to query it; init_db then adds the tables a partition
+leaves out (stats_counters, event_cursors).
+
+Rows copied from v1 have created_at = 0 (date unknown) and are never
+archived: there is no month to file them under.
+
+stats_counters keep lifetime totals: each chunk adds back the counts the
+delete triggers take off for the rows it moves. migrate.py --rebuild-stats
+only sees the hot tables, so after archiving it drops the archived rows
+from the totals. OUTCOME_MAX_AGE_HOURS should stay below the retention, or
+outcomes of archived signals have nothing to join.
+
+--compact moves message_text still stored inline (rows written before schema
+v6) into the compressed message_store, deletes bodies no signal refers to
+any more, then hands free pages back to the filesystem vacuum_pages at a
+time and truncates the WAL. Returning pages needs auto_vacuum=INCREMENTAL,
+which new databases get from init_db; an older file needs a one-time
+--enable-incremental-vacuum first. That is a full VACUUM, which rewrites
+the file and blocks writers while it runs, so do it off-peak.
+"""
+import os
+import time
+import sqlite3
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import db
+from message_store import message_hash, pack_message
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+RETENTION_DAYS = float(os.getenv('ARCHIVE_RETENTION_DAYS', '90'))
+LOG_RETENTION_DAYS = float(os.getenv('ARCHIVE_LOG_RETENTION_DAYS', str(RETENTION_DAYS)))
+
+PERFORMANCE_COLUMNS = ['id', 'signal_id', 'tp_hit', 'sl_hit', 'pips_gained', 'update_time']
+SECURITY_LOG_COLUMNS = ['id', 'event_type', 'description', 'timestamp', 'severity']
+
+# Counts of the rows about to be archived, added before the delete triggers
+# subtract them again so stats_counters keep lifetime totals
+KEEP_SIGNAL_COUNTS_SQL = '''INSERT INTO stats_counters (scope, key, count)
+    SELECT * FROM (SELECT 'total', '', COUNT(*) FROM signals WHERE id IN archive_ids
+                   UNION ALL SELECT 'direction', COALESCE(direction, ''), COUNT(*) FROM signals
+                             WHERE id IN archive_ids GROUP BY 2
+                   UNION ALL SELECT 'pair', COALESCE(pair, ''), COUNT(*) FROM signals
+                             WHERE id IN archive_ids GROUP BY 2
+                   UNION ALL SELECT 'channel', COALESCE(channel_name, ''), COUNT(*) FROM signals
+                             WHERE id IN archive_ids GROUP BY 2) WHERE true
+    ON CONFLICT (scope, key) DO UPDATE SET count = count + excluded.count'''
+KEEP_SECURITY_LOG_COUNTS_SQL = '''INSERT INTO stats_counters (scope, key, count)
+    SELECT 'severity', COALESCE(severity, ''), COUNT(*) FROM security_logs WHERE id IN archive_ids GROUP BY 2
+    ON CONFLICT (scope, key) DO UPDATE SET count = count + excluded.count'''
+
+
+def partition_path(archive_dir, month):
+    """Archive file for month ('YYYY-MM')"""
+    return os.path.join(archive_dir, f"signals_archive_{month.replace('-', '_')}.db")
+
+
+def create_partition(path):
+    """Create path with the hot tables' schema, if it is not there yet"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(db.SIGNALS_TABLE_SQL.format(table='signals'))
+        for index_sql in db.SIGNALS_INDEXES_SQL:
+            conn.execute(index_sql.format(table='signals'))
+        conn.execute(db.PERFORMANCE_TABLE_SQL)
+        conn.execute(db.PERFORMANCE_INDEX_SQL)
+        conn.execute(db.SECURITY_LOGS_TABLE_SQL)
+        conn.execute(db.MESSAGE_STORE_TABLE_SQL)
+        if not db.table_exists(conn, 'stats_counters'):
+            # Current signals layout but behind SCHEMA_VERSION, so init_db adds
+            # stats_counters (counted from the archived rows) and event_cursors
+            # the first time SIGNALS_DB points here
+            conn.execute(f'PRAGMA user_version = {db.SIGNALS_LAYOUT_VERSION}')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class Partitions:
+    """Keeps the partition of one month ATTACHed as 'archive' at a time"""
+
+    def __init__(self, conn, archive_dir):
+        self.conn = conn
+        self.archive_dir = archive_dir
+        self.month = None
+
+    def attach(self, month):
+        if month == self.month:
+            return
+        self.detach()
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = partition_path(self.archive_dir, month)
+        create_partition(path)
+        self.conn.execute('ATTACH DATABASE ? AS archive', (path,))
+        self.month = month
+
+    def detach(self):
+        if self.month is not None:
+            self.conn.execute('DETACH DATABASE archive')
+            self.month = None
+
+
+def month_bounds(created_at):
+    """('YYYY-MM', first second, first second of the next month) of the UTC month of created_at"""
+    start = datetime.fromtimestamp(created_at, timezone.utc).replace(day=1, hour=0, minute=0, second=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime('%Y-%m'), int(start.timestamp()), int(end.timestamp())
+
+
+def in_transaction(conn, work):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        result = work()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+def move_signals_chunk(conn, start, end, chunk_size):
+    """Move up to chunk_size signals with start <= created_at < end into the attached partition"""
+    conn.execute('DELETE FROM archive_ids')
+    count = conn.execute("""INSERT INTO archive_ids SELECT id FROM signals
+                            WHERE created_at >= ? AND created_at < ? ORDER BY created_at LIMIT ?""",
+                         (start, end, chunk_size)).rowcount
+    signal_columns = ', '.join(db.SIGNAL_COLUMNS)
+    performance_columns = ', '.join(PERFORMANCE_COLUMNS)
+    conn.execute(f"""INSERT OR IGNORE INTO archive.signals ({signal_columns})
+                     SELECT {signal_columns} FROM signals WHERE id IN archive_ids""")
+    conn.execute(f"""INSERT OR IGNORE INTO archive.performance ({performance_columns})
+                     SELECT {performance_columns} FROM performance WHERE signal_id IN archive_ids""")
+    conn.execute("""INSERT OR IGNORE INTO archive.message_store (hash, body)
+                    SELECT hash, body FROM message_store WHERE hash IN
+                    (SELECT message_hash FROM signals WHERE id IN archive_ids)""")
+    conn.execute("DELETE FROM performance WHERE signal_id IN archive_ids")
+    conn.execute(KEEP_SIGNAL_COUNTS_SQL)
+    conn.execute("DELETE FROM signals WHERE id IN archive_ids")
+    # A body stays hot while a newer signal (a cross-post, say) still uses it
+    conn.execute("""DELETE FROM message_store WHERE hash IN
+                    (SELECT message_hash FROM archive.signals WHERE id IN archive_ids)
+                    AND NOT EXISTS (SELECT 1 FROM signals WHERE message_hash = message_store.hash)""")
+    return count
+
+
+def move_security_logs_chunk(conn, month, cutoff, chunk_size):
+    """Move up to chunk_size of the oldest security logs of month older than cutoff into the attached partition"""
+    conn.execute('DELETE FROM archive_ids')
+    count = conn.execute("""INSERT INTO archive_ids SELECT id FROM
+                            (SELECT id, timestamp FROM security_logs ORDER BY id LIMIT ?)
+                            WHERE timestamp < ? AND substr(timestamp, 1, 7) = ?""",
+                         (chunk_size, cutoff, month)).rowcount
+    columns = ', '.join(SECURITY_LOG_COLUMNS)
+    conn.execute(f"""INSERT OR IGNORE INTO archive.security_logs ({columns})
+                     SELECT {columns} FROM security_logs WHERE id IN archive_ids""")
+    conn.execute(KEEP_SECURITY_LOG_COUNTS_SQL)
+    conn.execute("DELETE FROM security_logs WHERE id IN archive_ids")
+    return count
+
+
+def archive_signals(conn, partitions, cutoff, chunk_size=1000, pause=0.02):
+    """Move signals created before cutoff (epoch seconds) into monthly partitions, skipping undated ones"""
+    moved = 0
+    started = time.monotonic()
+    while True:
+        row = conn.execute("""SELECT created_at FROM signals WHERE created_at > 0 AND created_at < ?
+                              ORDER BY created_at LIMIT 1""", (cutoff,)).fetchone()
+        if row is None:
+            break
+        month, start, end = month_bounds(row[0])
+        partitions.attach(month)
+        moved += in_transaction(conn, lambda: move_signals_chunk(conn, max(start, 1), min(end, cutoff), chunk_size))
+        rate = moved / max(time.monotonic() - started, 1e-9)
+        logger.info(f"   {moved:,} signals archived, up to {month} ({rate:,.0f} rows/sec)")
+        time.sleep(pause)
+    logger.info(f"✅ Archived {moved:,} signals")
+    return moved
+
+
+def archive_security_logs(conn, partitions, cutoff, chunk_size=1000, pause=0.02):
+    """Move security logs with a timestamp before cutoff ('YYYY-MM-DD HH:MM:SS') into monthly partitions
+
+    Logs are taken oldest id first and stop at the first one inside the
+    retention, so no full scan is needed (the timestamp is not indexed).
+    """
+    moved = 0
+    while True:
+        row = conn.execute("SELECT timestamp FROM security_logs ORDER BY id LIMIT 1").fetchone()
+        if row is None or row[0] is None or row[0] >= cutoff:
+            break
+        month = row[0][:7]
+        partitions.attach(month)
+        moved += in_transaction(conn, lambda: move_security_logs_chunk(conn, month, cutoff, chunk_size))
+        time.sleep(pause)
+    logger.info(f"✅ Archived {moved:,} security logs")
+    return moved
+
+
+def archive(conn, archive_dir, retain_days, log_retain_days, chunk_size=1000, pause=0.02):
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_ids (id INTEGER PRIMARY KEY)')
+    partitions = Partitions(conn, archive_dir)
+    try:
+        archive_signals(conn, partitions, int(time.time() - retain_days * 86400), chunk_size, pause)
+        cutoff = (datetime.now() - timedelta(days=log_retain_days)).strftime('%Y-%m-%d %H:%M:%S')
+        archive_security_logs(conn, partitions, cutoff, chunk_size, pause)
+    finally:
+        partitions.detach()
+
+
+def pack_inline_text(conn, chunk_size=1000, pause=0.02):
+    """Move message_text stored in signals rows into message_store, chunk_size rows per transaction"""
+    last_id, packed = 0, 0
+
+    def pack_chunk():
+        rows = conn.execute("""SELECT id, message_text FROM signals
+                               WHERE id > ? AND message_text IS NOT NULL ORDER BY id LIMIT ?""",
+                            (last_id, chunk_size)).fetchall()
+        hashes = [message_hash(row[1]) for row in rows]
+        conn.executemany(db.INSERT_MESSAGE_SQL, [(text_hash, pack_message(row[1]))
+                                                  for text_hash, row in zip(hashes, rows)])
+        conn.executemany("UPDATE signals SET message_text = NULL, message_hash = ? WHERE id = ?",
+                         [(text_hash, row[0]) for text_hash, row in zip(hashes, rows)])
+        # The signals_edits trigger counted these as edits; the signals read the same as before
+        conn.execute("UPDATE stats_counters SET count = count - ? WHERE scope = 'edits' AND key = ''", (len(rows),))
+        return (rows[-1][0] if rows else last_id), len(rows)
+
+    while True:
+        last_id, count = in_transaction(conn, pack_chunk)
+        packed += count
+        if count < chunk_size:
+            break
+        logger.info(f"   {packed:,} message texts packed")
+        time.sleep(pause)
+    logger.info(f"✅ Packed {packed:,} inline message texts into message_store")
+
+
+def delete_orphan_messages(conn, chunk_size=1000, pause=0.02):
+    """Delete message_store bodies no signal refers to, walking the store by rowid"""
+    # Bodies stored after this point are left for the next run: save_signal
+    # writes a body just before its signal, possibly in the previous commit
+    last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM message_store").fetchone()[0]
+    rowid, deleted = 0, 0
+    while rowid < last_rowid:
+        end = min(rowid + chunk_size, last_rowid)
+        deleted += in_transaction(conn, lambda: conn.execute(
+            """DELETE FROM message_store WHERE rowid > ? AND rowid <= ?
+               AND NOT EXISTS (SELECT 1 FROM signals WHERE message_hash = message_store.hash)""",
+            (rowid, end)).rowcount)
+        rowid = end
+        time.sleep(pause)
+    logger.info(f"✅ Deleted {deleted:,} unreferenced message bodies")
+
+
+def reclaim_space(conn, vacuum_pages=1000, pause=0.02):
+    """Return free pages to the filesystem a few at a time, then truncate the WAL"""
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        logger.warning(f"⚠️ {free:,} free pages are reused but not returned: auto_vacuum is not INCREMENTAL, "
+                       f"run python archive.py --enable-incremental-vacuum once, off-peak")
+    else:
+        freed = 0
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        while free:
+            # Each call is a short write transaction of its own
+            conn.execute(f'PRAGMA incremental_vacuum({min(free, vacuum_pages)})').fetchall()
+            left = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if left >= free:
+                break
+            freed, free = freed + free - left, left
+            time.sleep(pause)
+        logger.info(f"✅ Returned {freed:,} free pages to the filesystem")
+    busy, _, _ = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    if busy:
+        logger.warning("⚠️ WAL checkpoint was blocked by readers, the WAL is truncated at the next one")
+
+
+def compact(conn, chunk_size=1000, pause=0.02, vacuum_pages=1000):
+    pack_inline_text(conn, chunk_size, pause)
+    delete_orphan_messages(conn, chunk_size, pause)
+    reclaim_space(conn, vacuum_pages, pause)
+
+
+def enable_incremental_vacuum(conn):
+    logger.info("🧹 Rewriting the database with auto_vacuum=INCREMENTAL (blocks writers until done)")
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    logger.info("✅ Incremental vacuum enabled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old signals and logs, and compact signals.db')
+    parser.add_argument('--db', default=db.DB_PATH, help='database file (default: %(default)s)')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR, help='monthly archive files (default: %(default)s)')
+    parser.add_argument('--retain-days', type=float, default=RETENTION_DAYS,
+                        help='days of signals kept in the database (default: %(default)s)')
+    parser.add_argument('--log-retain-days', type=float, default=LOG_RETENTION_DAYS,
+                        help='days of security logs kept in the database (default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='rows moved per transaction')
+    parser.add_argument('--pause-ms', type=float, default=20, help='sleep between chunks to let live writers in')
+    parser.add_argument('--compact', action='store_true', help='pack inline texts, drop unused ones, reclaim space')
+    parser.add_argument('--vacuum-pages', type=int, default=1000, help='pages returned per incremental vacuum step')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='one-time full VACUUM switching an older file to auto_vacuum=INCREMENTAL')
+    args = parser.parse_args()
+
+    db.DB_PATH = args.db
+    db.init_db()
+    conn = db.open_connection(args.db)
+    # Transactions are managed explicitly with BEGIN IMMEDIATE
+    conn.isolation_level = None
+    pause = args.pause_ms / 1000
+    try:
+        if db.schema_version(conn) < db.SIGNALS_LAYOUT_VERSION:
+            logger.error("❌ signals table is on schema v1, run python migrate.py first")
+            raise SystemExit(1)
+        if args.enable_incremental_vacuum:
+            enable_incremental_vacuum(conn)
+        elif args.compact:
+            compact(conn, args.chunk_size, pause, args.vacuum_pages)
+        else:
+            archive(conn, args.archive_dir, args.retain_days, args.log_retain_days, args.chunk_size, pause)
+    except sqlite3.OperationalError as e:
+        logger.error(f"❌ Archiving failed, safe to re-run: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
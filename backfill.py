@@ -0,0 +1,230 @@
+"""Bulk import of historical channel messages from Telegram exports
+
+    python backfill.py result.json [more.json|.jsonl ...] [--channel NAME] [--workers 4]
+                       [--batch-size 5000] [--db signals.db]
+
+Reads Telegram Desktop single-chat exports (result.json) and JSONL files with
+one exported message object per line. Both are streamed, so a file of
+hundreds of MB never has to fit in memory.
+
+Messages go through the same prefilter and parser as live updates, spread
+over a process pool, and the parsed rows are inserted with executemany,
+batch_size rows per transaction. INSERT OR IGNORE on the UNIQUE signal_hash
+keeps the live dedupe rule: a pair/entry that is already stored, or that
+appeared earlier in the import, is skipped.
+
+Message text goes into the compressed message_store in the same transaction
+as its signal rows.
+
+Rows keep the message's original date in created_at, so the API sorts them
+by time; the notifier and live dashboard don't treat them as new signals.
+The live bot and web process can keep running meanwhile.
+"""
+import os
+import re
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+from multiprocessing import Pool
+
+import db
+from prefilter import is_candidate_signal, load_channel_filters
+from signal_parser import parse_signal
+from symbols import load_instruments
+from message_store import message_hash, pack_message
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 1 << 20
+CHUNK_SIZE = 1000
+
+INSERT_COLUMNS = (['channel_name', 'pair', 'direction'] + db.PRICE_COLUMNS +
+                  ['timestamp', 'created_at', 'signal_hash', 'message_hash'])
+INSERT_BACKFILL_SQL = (f"INSERT OR IGNORE INTO signals ({', '.join(INSERT_COLUMNS)}) "
+                       f"VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})")
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r'[\s,]*')
+_CHAT_NAME = re.compile(r'"name"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def iter_export(f):
+    """Yield (chat name, message) from a Telegram Desktop export, reading it in chunks"""
+    buffer = ''
+    while True:
+        start = buffer.find('"messages"')
+        bracket = buffer.find('[', start) if start >= 0 else -1
+        if bracket >= 0:
+            break
+        chunk = f.read(READ_SIZE)
+        if not chunk:
+            raise ValueError('no "messages" array found')
+        buffer += chunk
+
+    match = _CHAT_NAME.search(buffer, 0, start)
+    name = json.loads(match.group(1)) if match else None
+
+    buffer, pos = buffer[bracket + 1:], 0
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if buffer.startswith(']', pos):
+            return
+        try:
+            message, pos = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Object cut off at the end of the buffer
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield name, message
+        if pos > READ_SIZE:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            message = json.loads(line)
+            yield message.get('channel') or message.get('chat'), message
+
+
+def message_text(message):
+    """Plain text of an exported message; formatted text is a list of strings and entities"""
+    text = message.get('text') or ''
+    if isinstance(text, list):
+        text = ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+    return text
+
+
+def message_time(message):
+    if message.get('date_unixtime'):
+        return int(message['date_unixtime'])
+    return int(datetime.fromisoformat(message['date']).timestamp())
+
+
+def iter_messages(paths, channel=None):
+    """Yield (channel, text, epoch seconds) for every text message in paths"""
+    for path in paths:
+        default_channel = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding='utf-8') as f:
+            messages = iter_jsonl(f) if path.endswith('.jsonl') else iter_export(f)
+            for name, message in messages:
+                if message.get('type', 'message') != 'message':
+                    continue
+                text = message_text(message)
+                if text:
+                    yield channel or name or default_channel, text, message_time(message)
+
+
+def parse_chunk(chunk):
+    """Parse (channel, text, time) messages into (signal rows, message_store rows); runs on a pool worker"""
+    rows, messages = [], {}
+    for channel, text, posted in chunk:
+        if not is_candidate_signal(text, channel):
+            continue
+        signal = parse_signal(text, channel)
+        if not signal['pair'] or not signal['entry']:
+            continue
+        prices = [db.to_price(signal[column]) for column in db.PRICE_COLUMNS]
+        text_hash = message_hash(signal['raw_text'])
+        if text_hash not in messages:
+            messages[text_hash] = pack_message(signal['raw_text'])
+        rows.append((channel, signal['pair'], signal['direction'], *prices,
+                     datetime.fromtimestamp(posted).strftime('%H:%M'), posted,
+                     db.generate_signal_hash(signal['pair'], signal['entry'], posted), text_hash))
+    return rows, list(messages.items())
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def insert_batch(conn, rows, messages):
+    """Insert rows and their message texts in one transaction; return how many rows were new"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.executemany(db.INSERT_MESSAGE_SQL, messages)
+        inserted = conn.executemany(INSERT_BACKFILL_SQL, rows).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted
+
+
+def init_worker():
+    load_channel_filters()
+    load_instruments()
+
+
+def backfill(conn, paths, channel=None, workers=None, batch_size=5000):
+    read = found = inserted = 0
+    started = time.monotonic()
+
+    def count_read(messages):
+        nonlocal read
+        for message in messages:
+            read += 1
+            yield message
+
+    batch, messages = [], []
+    with Pool(workers, initializer=init_worker) as pool:
+        # imap keeps file order, so the first copy of a signal is the one kept
+        for rows, texts in pool.imap(parse_chunk, chunked(count_read(iter_messages(paths, channel)), CHUNK_SIZE)):
+            batch += rows
+            messages += texts
+            if len(batch) >= batch_size:
+                found += len(batch)
+                inserted += insert_batch(conn, batch, messages)
+                batch, messages = [], []
+                rate = read / max(time.monotonic() - started, 1e-9)
+                logger.info(f"   {read:,} messages, {inserted:,} signals saved, {found - inserted:,} duplicates "
+                            f"({rate:,.0f} messages/sec)")
+    if batch:
+        found += len(batch)
+        inserted += insert_batch(conn, batch, messages)
+
+    elapsed = time.monotonic() - started
+    logger.info(f"✅ Backfilled {inserted:,} signals from {read:,} messages ({found - inserted:,} duplicates) "
+                f"in {elapsed:.1f}s ({read / max(elapsed, 1e-9):,.0f} messages/sec)")
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import signals from Telegram channel exports')
+    parser.add_argument('paths', nargs='+', help='result.json exports or .jsonl files')
+    parser.add_argument('--channel', help='channel name to store (default: the export\'s chat name)')
+    parser.add_argument('--workers', type=int, default=None, help='parser processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows inserted per transaction')
+    parser.add_argument('--db', default=db.DB_PATH, help='database file (default: %(default)s)')
+    args = parser.parse_args()
+
+    db.DB_PATH = args.db
+    db.init_db()
+    conn = db.open_connection(args.db)
+    # Transactions are managed explicitly with BEGIN IMMEDIATE
+    conn.isolation_level = None
+    try:
+        if db.schema_version(conn) < db.SIGNALS_LAYOUT_VERSION:
+            logger.error("❌ signals table is on schema v1, run python migrate.py first")
+            raise SystemExit(1)
+        backfill(conn, args.paths, args.channel, args.workers, args.batch_size)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Parser golden check and prefilter/parser throughput benchmark
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parser [--seconds 3]
+
+Every message in golden_signals.json is parsed first and compared with the
+recorded output; the benchmark only runs if they all still match. Cases
+with a "candidate" key also check is_candidate_signal's verdict.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from prefilter import is_candidate_signal
+from signal_parser import parse_signal
+
+GOLDEN_FILE = os.path.join(os.path.dirname(__file__), 'golden_signals.json')
+
+
+def load_golden():
+    with open(GOLDEN_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_golden(cases):
+    """Return a list of (case, field, expected, got) mismatches"""
+    mismatches = []
+    for case in cases:
+        if 'candidate' in case:
+            candidate = is_candidate_signal(case['text'], case['channel'])
+            if candidate != case['candidate']:
+                mismatches.append((case, 'candidate', case['candidate'], candidate))
+        signal = parse_signal(case['text'], case['channel'])
+        for field, expected in case['expected'].items():
+            if signal[field] != expected:
+                mismatches.append((case, field, expected, signal[field]))
+    return mismatches
+
+
+def bench(func, messages, seconds):
+    """Run func over messages in a loop for roughly `seconds`, return messages/second"""
+    done = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for channel, text in messages:
+            func(text, channel)
+        done += len(messages)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parser golden check and throughput benchmark')
+    parser.add_argument('--seconds', type=float, default=3.0, help='how long to run the benchmark')
+    args = parser.parse_args()
+
+    cases = load_golden()
+    mismatches = check_golden(cases)
+    for case, field, expected, got in mismatches:
+        print(f"❌ {case['text']!r}: {field} expected {expected!r}, got {got!r}")
+    if mismatches:
+        sys.exit(1)
+    print(f"✅ {len(cases)} golden messages match")
+
+    messages = [(case['channel'], case['text']) for case in cases]
+    for name, func in (('is_candidate_signal', is_candidate_signal), ('parse_signal', parse_signal)):
+        rate = bench(func, messages, args.seconds)
+        print(f"{name}: {rate:,.0f} messages/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Telegram sender check against the local fake Bot API
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sender [--messages 300] [--chats 10] [--chat-rate 20]
+                                      [--global-rate 100] [--throttle-every 50]
+
+Sends messages round-robin to --chats private chats through a TelegramSender
+pointed at an in-process FakeBotAPI, then checks that every message arrived,
+that each chat's messages arrived in order, and that neither the per-chat nor
+the global rate was exceeded (beyond the allowed burst). Rates are scaled up
+from Telegram's real limits so the run takes seconds, not minutes.
+"""
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+from benchmarks.fake_bot_api import FakeBotAPI
+from sender import TelegramSender
+
+
+def max_rate(times, window=1.0):
+    """Most messages seen in any `window` seconds"""
+    most, start = 0, 0
+    for end in range(len(times)):
+        while times[end] - times[start] > window:
+            start += 1
+        most = max(most, end - start + 1)
+    return most
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telegram sender check against a local fake Bot API')
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--chats', type=int, default=10)
+    parser.add_argument('--chat-rate', type=float, default=20, help='messages/sec allowed per chat')
+    parser.add_argument('--global-rate', type=float, default=100, help='messages/sec allowed overall')
+    parser.add_argument('--throttle-every', type=int, default=50, help='fake API answers every Nth request with 429')
+    args = parser.parse_args()
+
+    api = FakeBotAPI(throttle_every=args.throttle_every, retry_after=1).start()
+    sender = TelegramSender('TEST', api_url=api.url, global_rate=args.global_rate, chat_rate=args.chat_rate,
+                            digest_window=0)
+
+    started = time.monotonic()
+    futures = [sender.send_message(1000 + i % args.chats, f'message {i}') for i in range(args.messages)]
+    delivered = sum(1 for future in futures if future.result(timeout=120))
+    elapsed = time.monotonic() - started
+    sender.close()
+    api.stop()
+
+    by_chat = defaultdict(list)
+    for received, chat_id, text in api.messages:
+        by_chat[chat_id].append((received, int(text.split()[1])))
+    in_order = all([n for _, n in messages] == sorted(n for _, n in messages) for messages in by_chat.values())
+    chat_peak = max(max_rate([t for t, _ in messages]) for messages in by_chat.values())
+    global_peak = max_rate([t for t, _, _ in api.messages])
+
+    print(f"delivered: {delivered}/{args.messages} in {elapsed:.2f}s ({delivered / elapsed:,.0f} messages/sec)")
+    print(f"429 responses retried: {api.throttled}, connections opened: {api.connections}")
+    print(f"peak per-chat rate: {chat_peak}/s (limit {args.chat_rate:g}), "
+          f"peak global rate: {global_peak}/s (limit {args.global_rate:g} + burst)")
+
+    ok = (delivered == args.messages and in_order and chat_peak <= args.chat_rate + 1
+          and global_peak <= 2 * args.global_rate)
+    print("✅ sender behaves" if ok else "❌ sender misbehaved" + ("" if in_order else ": messages out of order"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Seeded synthetic corpus of channel messages and stored signal rows
+
+generate_messages() mixes signals in the formats parse_signal handles
+(TP1..TP6, take profit / target wording, entry zones, @ prices, leverage
+and cross margin, emoji and pipe-separated layouts) with the chatter
+channels post between them: greetings, results, commentary and long
+analysis posts. The same seed always gives the same corpus, so results
+are comparable between commits.
+
+generate_rows() yields schema v2 rows directly, for filling large databases
+without going through the parser; their pairs are canonical, as
+parse_signal stores them.
+"""
+import random
+
+from db import PRICE_COLUMNS, generate_signal_hash
+from symbols import normalize_pair
+
+# pair -> (typical price, decimals)
+PAIRS = {
+    'XAUUSD': (2350, 2), 'BTCUSDT': (64000, 1), 'ETHUSDT': (3400, 2), 'EURUSD': (1.085, 5),
+    'GBPUSD': (1.27, 5), 'USDJPY': (151.5, 3), 'AUDCAD': (0.905, 5), 'EURGBP': (0.856, 5),
+    'GBPJPY': (191.2, 3), 'US30': (39000, 0), 'SOLUSDT': (150, 3), 'XRPUSDT': (0.52, 4),
+    'WOO/USDT': (0.22, 4), 'ID/USDT': (0.58, 4), 'GOLD': (2350, 2), 'ICP/USDT': (12.4, 3),
+}
+CHANNELS = [f'Channel {n:02d}' for n in range(1, 54)]
+
+CHATTER = [
+    'Good morning traders ☀️ get ready for NFP today',
+    'TP1 hit on {pair} ✅ +{pips} pips, move SL to breakeven',
+    'Close all {pair} positions now',
+    'Market is choppy today, stay patient and protect your capital',
+    'Weekly results: {pips} pips profit 🔥 join VIP for more',
+    '{pair} looks weak below the daily pivot, waiting for confirmation',
+    'Reminder: never risk more than 2% per trade',
+    'Analysis: {pair} rejected the weekly resistance twice. ' * 8 + 'We wait for a clean break and retest before entering.',
+]
+
+
+def price(rng, pair, spread=0.0):
+    base, decimals = PAIRS[pair]
+    return f'{base * (1 + rng.uniform(-0.05, 0.05) + spread):.{decimals}f}'
+
+
+def signal_message(rng):
+    pair = rng.choice(list(PAIRS))
+    buy = rng.random() < 0.5
+    direction = rng.choice(['BUY', 'Buy', 'LONG']) if buy else rng.choice(['SELL', 'Sell', 'SHORT'])
+    sign = 1 if buy else -1
+    entry = price(rng, pair)
+    step = 0.002 * sign
+    tps = [price(rng, pair, step * (n + 1)) for n in range(rng.randint(1, 6))]
+    sl = price(rng, pair, -3 * step)
+    layout = rng.randrange(6)
+
+    if layout == 0:
+        lines = [f'{pair} {direction} @ {entry}'] + [f'TP{n} {tp}' for n, tp in enumerate(tps, 1)] + [f'SL {sl}']
+    elif layout == 1:
+        lines = [f"{'🟢' if buy else '🔴'} {pair} {direction.lower()} now", f'Entry: {entry}']
+        lines += [f'Take Profit {n}: {tp}' for n, tp in enumerate(tps, 1)] + [f'Stop Loss: {sl}']
+    elif layout == 2:
+        zone = price(rng, pair, 0.001)
+        lines = [f'{pair} {direction}', f"Cross {rng.choice([5, 10, 20, 25])}x", f'Entry zone: {entry}-{zone}']
+        lines += [f'Target {n}: {tp}' for n, tp in enumerate(tps, 1)] + [f'Stoploss: {sl}']
+    elif layout == 3:
+        parts = [f'{pair} {direction}', f"Leverage {rng.choice([10, 15, 20])}x", f'Entry {entry}']
+        parts += [f'TP{n} {tp}' for n, tp in enumerate(tps, 1)] + [f'SL {sl}']
+        return ' | '.join(parts)
+    elif layout == 4:
+        lines = [f'{pair}', f'Direction: {direction}', f'Enter: {entry}']
+        lines += [f'TP-{n}: {tp}' for n, tp in enumerate(tps, 1)] + [f'SL-{sl}']
+    else:
+        lines = [f'{pair} {direction.lower()} limit @ {entry} tp {tps[0]} sl {sl}']
+    return '\n'.join(lines)
+
+
+def chatter_message(rng):
+    template = rng.choice(CHATTER)
+    return template.format(pair=rng.choice(list(PAIRS)), pips=rng.randint(10, 900))
+
+
+def generate_messages(count, seed=0, signal_ratio=0.4):
+    """count (channel, text) pairs, about signal_ratio of them signals"""
+    rng = random.Random(seed)
+    return [(rng.choice(CHANNELS), signal_message(rng) if rng.random() < signal_ratio else chatter_message(rng))
+            for _ in range(count)]
+
+
+def generate_rows(count, seed=0, start=1640995200, interval=6):
+    """count schema v2 signal rows, created_at rising by about interval seconds each"""
+    rng = random.Random(seed)
+    pairs = list(PAIRS)
+    created_at = start
+    for n in range(count):
+        pair = rng.choice(pairs)
+        prices = [float(price(rng, pair))] + [None] * (len(PRICE_COLUMNS) - 1)
+        prices[1] = float(price(rng, pair, 0.002))
+        prices[7] = float(price(rng, pair, -0.006))
+        created_at += rng.randint(0, 2 * interval)
+        yield (rng.choice(CHANNELS), normalize_pair(pair), rng.choice(['BUY', 'SELL']), *prices, '00:00', created_at,
+               generate_signal_hash(pair, f'{n}', created_at), f'{pair} synthetic signal {n}')
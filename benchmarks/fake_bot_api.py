@@ -0,0 +1,106 @@
+"""Local stand-in for the Telegram Bot API, for exercising sender.py
+
+    python -m benchmarks.fake_bot_api [--port 8081] [--throttle-every 20] [--retry-after 1]
+
+Answers sendMessage like Telegram does and records every accepted message.
+With --throttle-every N, every Nth request gets a 429 with retry_after, so
+the sender's backoff path runs too. Point the sender at it with
+TELEGRAM_API_URL=http://127.0.0.1:8081.
+
+bench_sender starts one in-process through FakeBotAPI.
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEND_MESSAGE_PATH = re.compile(r'^/bot[^/]+/sendMessage$')
+
+
+class FakeBotAPI:
+    def __init__(self, port=0, throttle_every=0, retry_after=1):
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        # (time received, chat_id, text) for every accepted message
+        self.messages = []
+        self.requests = 0
+        self.throttled = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.url = f'http://127.0.0.1:{self.port}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='fake-bot-api', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with api._lock:
+                    api.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not SEND_MESSAGE_PATH.match(self.path):
+                    return self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                payload = json.loads(body or b'{}')
+                with api._lock:
+                    api.requests += 1
+                    throttle = api.throttle_every and api.requests % api.throttle_every == 0
+                    if throttle:
+                        api.throttled += 1
+                    else:
+                        api.messages.append((time.monotonic(), payload.get('chat_id'), payload.get('text')))
+                if throttle:
+                    return self._reply(429, {'ok': False, 'error_code': 429,
+                                             'description': f'Too Many Requests: retry after {api.retry_after}',
+                                             'parameters': {'retry_after': api.retry_after}})
+                self._reply(200, {'ok': True, 'result': {'message_id': api.requests, 'chat': {'id': payload.get('chat_id')},
+                                                         'text': payload.get('text')}})
+
+            def _reply(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Telegram Bot API')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--throttle-every', type=int, default=0, help='answer every Nth request with a 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after sent with a 429')
+    args = parser.parse_args()
+
+    api = FakeBotAPI(args.port, args.throttle_every, args.retry_after)
+    print(f"🤖 Fake Bot API listening on {api.url}")
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"{len(api.messages)} messages accepted, {api.throttled} throttled, {api.connections} connections")
+
+
+if __name__ == '__main__':
+    main()
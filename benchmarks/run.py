@@ -0,0 +1,566 @@
+"""Benchmark suite with machine-readable results
+
+Run from the repository root:
+
+    python -m benchmarks.run [--quick] [--rows 10000,1000000,10000000] [--seconds 2]
+                             [--output results.json] [--compare baseline.json]
+
+Before measuring, the parser golden check runs, and init_db is checked
+against a schema v1 database (the layout production has until migrate.py
+runs) so that every process still starts, saves and serves signals on it. The
+outcome benchmarks first check a bar that hits a signal's stop and a target.
+
+Measures, on a corpus from benchmarks.corpus with a fixed seed:
+
+    parser.*      prefilter, symbol resolver and parse_signal throughput (after
+                  the golden check)
+    dedupe.*      DedupeIndex lookups and NearDuplicateIndex checks with 50k
+                  recent entries
+    save_signal.* insert rate from one thread and from 16 (group commit)
+    bot.*         Bot.py handler updates/sec for a burst of signal posts over
+                  the 53 channels: one at a time on the event loop (the old
+                  handler) and concurrently through the persist executor;
+                  and edits of those posts re-parsed into their rows
+    webhook.*     /webhook requests/sec through the Flask test client, and
+                  how fast the ingestion workers drain them
+    api_signals.* db.query_signals and /api/signals latency (p50/p95 ms) at
+                  each --rows size: newest page, deep page, filtered page
+    message_store.* packing and unpacking of raw message texts (messages/sec)
+                  and the mean stored body size in bytes
+    outcomes.*    OutcomeTracker ticks/sec with 1k and 100k open signals
+    startup.*     cold start of core, Bot and server in a fresh interpreter
+                  (median ms): module imports, core.startup() against the
+                  smallest --rows database, and the whole process
+
+Databases for --rows are generated once into --data-dir and reused; 10M
+rows take a few minutes and about 3 GB. --quick only uses 10k rows.
+
+Results are written as a flat {metric: value} JSON object plus metadata.
+Metrics ending in _per_sec are better higher, _ms lower. --compare prints
+the change against an earlier results file and exits 1 if any metric got
+worse by more than --threshold percent.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import random
+import logging
+import sqlite3
+import platform
+import argparse
+import tempfile
+import subprocess
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+from db import OUTCOME_COLUMNS
+from dedupe import DedupeIndex, NearDuplicateIndex
+from prefilter import is_candidate_signal
+from signal_parser import parse_signal
+from symbols import normalize_pair, resolve_symbol
+from message_store import message_hash, pack_message, unpack_message
+from benchmarks.bench_parser import bench, check_golden, load_golden
+from outcomes import OutcomeTracker
+from benchmarks.corpus import CHANNELS, PAIRS, generate_messages, generate_rows
+
+SEED = 20240501
+DEFAULT_ROWS = '10000,1000000,10000000'
+LATENCY_SAMPLES = 200
+BUILD_BATCH = 100000
+SERIAL_SAVES = 200
+OUTCOME_OPEN_SIGNALS = [1000, 100000]
+BOT_BURST = 1060
+NEAR_DUPLICATE_ENTRIES = 50000
+STARTUP_RUNS = 7
+STARTUP_SCRIPT = '''import time
+start = time.perf_counter()
+import core, {module}
+imported = time.perf_counter()
+core.startup()
+print(imported - start, time.perf_counter() - imported)
+'''
+# signals as created before schema v2
+V1_SIGNALS_SQL = '''CREATE TABLE signals
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT, channel_name TEXT, pair TEXT, direction TEXT,
+                     entry TEXT, tp1 TEXT, tp2 TEXT, tp3 TEXT, tp4 TEXT, tp5 TEXT, tp6 TEXT, sl TEXT,
+                     leverage TEXT, timestamp TEXT, signal_hash TEXT UNIQUE, message_text TEXT)'''
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_database(path):
+    """Point db at path (fresh pool, dedupe index reloaded)"""
+    db.close_pool()
+    db.DB_PATH = path
+    db.init_db()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {'p50_ms': samples[len(samples) // 2] * 1000, 'p95_ms': samples[int(len(samples) * 0.95)] * 1000}
+
+
+def timed(func, calls):
+    """Latency percentiles of calling func(i) for i in range(calls)"""
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def signal_messages(messages):
+    """The corpus messages that would be saved"""
+    signals = []
+    for channel, text in messages:
+        if is_candidate_signal(text, channel):
+            signal = parse_signal(text, channel)
+            if signal['pair'] and signal['entry']:
+                signals.append(signal)
+    return signals
+
+
+def bench_parser(messages, seconds):
+    mismatches = check_golden(load_golden())
+    if mismatches:
+        raise SystemExit(f"❌ {len(mismatches)} golden mismatches, run python -m benchmarks.bench_parser")
+    candidates = [(channel, text) for channel, text in messages if is_candidate_signal(text, channel)]
+
+    def prefilter_and_parse(text, channel):
+        if is_candidate_signal(text, channel):
+            parse_signal(text, channel)
+
+    upper = [(channel, text.upper()) for channel, text in candidates]
+    return {
+        'parser.is_candidate_signal.messages_per_sec': bench(is_candidate_signal, messages, seconds),
+        'parser.resolve_symbol.messages_per_sec': bench(lambda text, channel: resolve_symbol(text), upper, seconds),
+        'parser.parse_signal.messages_per_sec': bench(parse_signal, candidates, seconds),
+        'parser.pipeline.messages_per_sec': bench(prefilter_and_parse, messages, seconds)
+    }
+
+
+def bench_message_store(signals, seconds):
+    texts = [(signal['channel'], signal['raw_text']) for signal in signals]
+    bodies = [(channel, pack_message(text)) for channel, text in texts]
+    return {
+        'message_store.pack.messages_per_sec': bench(lambda text, channel: pack_message(text), texts, seconds),
+        'message_store.unpack.messages_per_sec': bench(lambda body, channel: unpack_message(body), bodies, seconds),
+        'message_store.packed_bytes_per_message': sum(len(body) for _, body in bodies) / len(bodies),
+    }
+
+
+def bench_dedupe(signals, seconds):
+    index = DedupeIndex(max_entries=len(signals))
+    hashes = [db.generate_signal_hash(signal['pair'], signal['entry']) for signal in signals]
+    index.load(hashes[::2])
+
+    lookups = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for signal_hash in hashes:
+            signal_hash in index
+        lookups += len(hashes)
+    results = {'dedupe.index.lookups_per_sec': lookups / (time.perf_counter() - start)}
+
+    # Near-duplicate index holding NEAR_DUPLICATE_ENTRIES recent entries over the corpus pairs
+    rng = random.Random(SEED)
+    near = NearDuplicateIndex(window=float('inf'))
+    keys = [(pair, direction) for pair in PAIRS for direction in ('BUY', 'SELL')]
+    near.load(((key, PAIRS[key[0]][0] * rng.uniform(0.9, 1.1), 0) for key in
+               (rng.choice(keys) for _ in range(NEAR_DUPLICATE_ENTRIES))))
+    probes = [(key, PAIRS[key[0]][0] * rng.uniform(0.9, 1.1)) for key in (rng.choice(keys) for _ in range(1000))]
+    checks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for key, price in probes:
+            near.check_and_add(key, price, 0)
+        checks += len(probes)
+    results['dedupe.near_index.checks_per_sec'] = checks / (time.perf_counter() - start)
+
+    return results
+
+
+def check_v1_database(path, signal):
+    """init_db, save_signal and query_signals on a schema v1 database; exits if any fails"""
+    conn = sqlite3.connect(path)
+    conn.execute(V1_SIGNALS_SQL)
+    conn.execute("INSERT INTO signals (pair, direction, entry, signal_hash, message_text) "
+                 "VALUES ('XAUUSD', 'BUY', '2345', 'v1', 'XAUUSD BUY 2345')")
+    conn.commit()
+    conn.close()
+    try:
+        use_database(path)
+        saved = db.save_signal(signal)
+    except sqlite3.Error as e:
+        raise SystemExit(f"❌ schema v1 database: {e}")
+    if not saved:
+        raise SystemExit("❌ schema v1 database: save_signal did not store a new signal")
+    newest = db.query_signals(limit=1)
+    polled = db.query_signals(since_id=1, fields=['id', 'pair'])
+    if [row['pair'] for row in newest] != [signal['pair']] or [row['id'] for row in polled] != [2]:
+        raise SystemExit("❌ schema v1 database: query_signals did not return the saved signal")
+
+
+def bench_save_signal(signals):
+    results = {}
+    for threads in (1, 16):
+        # Unique entries so every save is a real insert; one thread waits out
+        # each group commit window, so it gets a smaller sample
+        sample = signals[:SERIAL_SAVES] if threads == 1 else signals
+        batch = [dict(signal, entry=f"{signal['entry']}{threads}{n}") for n, signal in enumerate(sample)]
+        start = time.perf_counter()
+        if threads == 1:
+            for signal in batch:
+                db.save_signal(signal)
+        else:
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(db.save_signal, batch))
+        results[f'save_signal.threads_{threads}.inserts_per_sec'] = len(batch) / (time.perf_counter() - start)
+    return results
+
+
+def load_server():
+    try:
+        import server
+    except ImportError as e:
+        print(f"⚠️ Skipping HTTP benchmarks: {e}")
+        return None
+    return server
+
+
+def bench_webhook(server, messages):
+    client = server.app.test_client()
+    server.ingestor.start()
+    first = server.ingestor.stats()['processed']
+    start = time.perf_counter()
+    for update_id, (channel, text) in enumerate(messages, 1_000_000):
+        update = {'update_id': update_id,
+                  'channel_post': {'chat': {'id': CHANNELS.index(channel), 'title': channel}, 'text': text}}
+        while client.post('/webhook', json=update).status_code == 503:
+            time.sleep(0.001)
+    acked = time.perf_counter() - start
+    while server.ingestor.stats()['processed'] - first < len(messages):
+        time.sleep(0.005)
+    drained = time.perf_counter() - start
+    return {'webhook.acknowledged.requests_per_sec': len(messages) / acked,
+            'webhook.processed.updates_per_sec': len(messages) / drained}
+
+
+def build_database(path, rows):
+    """Fill a fresh database with rows synthetic signals, their texts in message_store"""
+    print(f"🏗️ Building {path} with {rows:,} rows (once)")
+    use_database(path)
+    conn = db.open_connection(path)
+    conn.isolation_level = None
+    conn.execute('PRAGMA synchronous=OFF')
+    # Counters are rebuilt once at the end instead of per row
+    for trigger in db.STATS_TRIGGERS_SQL:
+        if trigger.startswith('signals_'):
+            conn.execute(f'DROP TRIGGER {trigger}')
+    columns = ['channel_name', 'pair', 'direction'] + db.PRICE_COLUMNS + ['timestamp', 'created_at', 'signal_hash',
+                                                                           'message_hash']
+    sql = f"INSERT INTO signals ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    generated = generate_rows(rows, SEED)
+    done = 0
+    while done < rows:
+        batch, messages = [], []
+        for _, row in zip(range(BUILD_BATCH), generated):
+            text_hash = message_hash(row[-1])
+            messages.append((text_hash, pack_message(row[-1])))
+            batch.append(row[:-1] + (text_hash,))
+        conn.execute('BEGIN')
+        conn.executemany(db.INSERT_MESSAGE_SQL, messages)
+        conn.executemany(sql, batch)
+        conn.execute('COMMIT')
+        done += len(batch)
+    conn.execute('BEGIN')
+    for trigger_sql in db.STATS_TRIGGERS_SQL.values():
+        conn.execute(trigger_sql)
+    db.rebuild_stats_counters(conn)
+    conn.execute('COMMIT')
+    conn.execute('ANALYZE')
+    conn.close()
+
+
+def sized_database(data_dir, rows):
+    path = os.path.join(data_dir, f'signals_{rows}.db')
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        try:
+            count = conn.execute("SELECT count FROM stats_counters WHERE scope = 'total'").fetchone()
+        except sqlite3.Error:
+            count = None
+        conn.close()
+        if count and count[0] == rows:
+            return path
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    build_database(path, rows)
+    return path
+
+
+def bench_api_signals(server, path, rows):
+    use_database(path)
+    rng = random.Random(SEED)
+    max_id = db.get_max_signal_id()
+    cursors = [rng.randint(max_id // 2, max_id) for _ in range(LATENCY_SAMPLES)]
+    pairs = [normalize_pair(rng.choice(list(PAIRS))) for _ in range(LATENCY_SAMPLES)]
+
+    shapes = {
+        'latest': ({'limit': 50}, ''),
+        'deep_page': (lambda i: {'before_id': cursors[i], 'limit': 50}, lambda i: f'before_id={cursors[i]}'),
+        'pair_page': (lambda i: {'filters': {'pair': pairs[i]}, 'before_id': cursors[i], 'limit': 50},
+                      lambda i: f'pair={pairs[i]}&before_id={cursors[i]}'),
+    }
+    results = {}
+    for shape, (query, params) in shapes.items():
+        kwargs = query if callable(query) else (lambda i, query=query: query)
+        for name, value in timed(lambda i: db.query_signals(**kwargs(i)), LATENCY_SAMPLES).items():
+            results[f'api_signals.rows_{rows}.db.{shape}.{name}'] = value
+        if server is None:
+            continue
+        client = server.app.test_client()
+        url = (lambda i: f'/api/signals?{params(i)}') if callable(params) else (lambda i: '/api/signals')
+        for name, value in timed(lambda i: client.get(url(i)), LATENCY_SAMPLES).items():
+            results[f'api_signals.rows_{rows}.http.{shape}.{name}'] = value
+
+    if server is not None:
+        # Unchanged poll carrying the ETag: answered from the response cache
+        client = server.app.test_client()
+        etag = client.get('/api/signals').headers['ETag']
+        for name, value in timed(lambda i: client.get('/api/signals', headers={'If-None-Match': etag}),
+                                 LATENCY_SAMPLES).items():
+            results[f'api_signals.rows_{rows}.http.not_modified.{name}'] = value
+    return results
+
+
+def bench_bot_burst(messages, journal_dir):
+    """Bot.py handler rate for a burst of posts across all channels: one at a time vs concurrent"""
+    import Bot
+    import journal
+    journal._journal = journal.SignalJournal(journal_dir)
+
+    def update(n, channel, text, run):
+        # A fresh entry price, so every post in the burst is a real insert
+        entry = parse_signal(text, channel)['entry']
+        text = text.replace(entry, f'{entry}{run}{n}', 1)
+        chat = SimpleNamespace(id=CHANNELS.index(channel), title=channel)
+        return SimpleNamespace(channel_post=SimpleNamespace(chat=chat, text=text, message_id=run * BOT_BURST + n),
+                               edited_channel_post=None)
+
+    async def concurrent(updates):
+        # What python-telegram-bot's concurrent_updates does: a task per update, bounded
+        slots = asyncio.Semaphore(Bot.BOT_CONCURRENT_UPDATES)
+
+        async def handle(update):
+            async with slots:
+                await Bot.handle_message(update, None)
+        await asyncio.gather(*(handle(update) for update in updates))
+
+    posts = messages[:BOT_BURST]
+    # Runs 3 and 4: bench_save_signal's suffixes 1 and 16 already stored the same corpus entries
+    serial = [update(n, channel, text, 3) for n, (channel, text) in enumerate(posts[:SERIAL_SAVES])]
+    burst = [update(n, channel, text, 4) for n, (channel, text) in enumerate(posts)]
+
+    start = time.perf_counter()
+    # The old handler: every post parsed and saved on the event loop, in turn
+    for post in serial:
+        Bot.process_post(post.channel_post.text, post.channel_post.chat.title)
+    results = {'bot.burst.serial.updates_per_sec': len(serial) / (time.perf_counter() - start)}
+
+    start = time.perf_counter()
+    asyncio.run(concurrent(burst))
+    results['bot.burst.concurrent.updates_per_sec'] = len(burst) / (time.perf_counter() - start)
+
+    # Edits filling in a TP6: found through the message index and updated in place
+    edits = [(post.channel_post, f'{post.channel_post.text}\nTP6 {n + 1}') for n, post in enumerate(burst[:SERIAL_SAVES])]
+    start = time.perf_counter()
+    for post, text in edits:
+        Bot.process_post(text, post.chat.title, post.chat.id, post.message_id, edited=True)
+    results['bot.edit.updates_per_sec'] = len(edits) / (time.perf_counter() - start)
+    journal._journal.close()
+    return results
+
+
+def check_outcomes():
+    """A bar that reaches both the stop and a target of a signal; exits if the tracker gets it wrong"""
+    outcomes = []
+    tracker = OutcomeTracker(max_age=float('inf'), record=lambda *outcome: outcomes.append(outcome[:3]))
+    row = dict.fromkeys(OUTCOME_COLUMNS)
+    row.update(id=1, pair='XAUUSD', direction='BUY', entry=2000.0, tp1=2010.0, tp2=2020.0, sl=1990.0, created_at=0)
+    tracker.add(row)
+    # Others far from the price keep the book too big to be compacted
+    for signal_id in range(2, 6):
+        tracker.add(dict(row, id=signal_id, entry=2100.0, tp1=2200.0, tp2=None, sl=1900.0))
+    tracker.on_price(1, 'XAUUSD', 2015.0, 1985.0)
+    book = tracker.books['XAUUSD']
+    stale = sum(1 for entry in book.rising + book.falling if entry[2].closed)
+    if outcomes != [(1, None, 1)] or book.stale != stale:
+        raise SystemExit(f"❌ outcome tracker: same-bar stop and target recorded {outcomes}, "
+                         f"{book.stale} stale levels counted for {stale}")
+
+
+def bench_outcomes(open_signals, seconds):
+    """OutcomeTracker ticks/sec with open_signals open, prices random-walking around their entries"""
+    rng = random.Random(SEED)
+    tracker = OutcomeTracker(max_age=float('inf'), record=lambda *outcome: None)
+    # One price walk per instrument (GOLD and XAUUSD are the same book)
+    bases = {}
+    for pair, (base, _) in PAIRS.items():
+        bases.setdefault(normalize_pair(pair), base)
+    pairs = list(bases)
+    for signal_id in range(1, open_signals + 1):
+        pair = pairs[signal_id % len(pairs)]
+        entry, sign = bases[pair] * rng.uniform(0.95, 1.05), rng.choice([1, -1])
+        row = dict.fromkeys(OUTCOME_COLUMNS)
+        row.update(id=signal_id, pair=pair, direction='BUY' if sign > 0 else 'SELL', entry=entry, created_at=0,
+                   sl=entry * (1 - 0.03 * sign), **{f'tp{n}': entry * (1 + 0.01 * n * sign) for n in range(1, 4)})
+        tracker.add(row)
+    # The first prices activate every signal and settle the levels already
+    # crossed; time the steady state after them
+    prices = dict(bases)
+    for pair, price in prices.items():
+        tracker.on_price(1, pair, price)
+    ticks = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(1000):
+            pair = pairs[ticks % len(pairs)]
+            prices[pair] *= 1 + rng.gauss(0, 0.0005)
+            tracker.on_price(1, pair, prices[pair])
+            ticks += 1
+    elapsed = time.perf_counter() - start
+    return {f'outcomes.open_{open_signals}.ticks_per_sec': ticks / elapsed}
+
+
+def bench_startup(path, modules):
+    """Cold start of each entry module in a fresh interpreter against an existing database"""
+    env = dict(os.environ, SIGNALS_DB=path)
+    env.pop('TELEGRAM_BOT_TOKEN', None)
+    results = {}
+    for module in modules:
+        imports, startups, processes = [], [], []
+        for _ in range(STARTUP_RUNS):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(module=module)], cwd=ROOT, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            processes.append(time.perf_counter() - start)
+            imported, started = map(float, output.split()[-2:])
+            imports.append(imported)
+            startups.append(started)
+        for name, samples in (('import', imports), ('startup', startups), ('process', processes)):
+            results[f'startup.{module}.{name}_ms'] = sorted(samples)[len(samples) // 2] * 1000
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print the change against baseline; return the metrics that regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for metric in sorted(set(results) & set(baseline)):
+        old, new = baseline[metric], results[metric]
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if metric.endswith('_per_sec') else change
+        flag = '❌' if worse > threshold else '  '
+        print(f"{flag} {metric}: {old:,.3f} -> {new:,.3f} ({change:+.1f}%)")
+        if worse > threshold:
+            regressions.append(metric)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Signal pipeline benchmark suite')
+    parser.add_argument('--quick', action='store_true', help='short runs, 10k-row database only')
+    parser.add_argument('--rows', default=DEFAULT_ROWS, help='comma-separated database sizes for api_signals')
+    parser.add_argument('--seconds', type=float, default=2.0, help='duration of each throughput benchmark')
+    parser.add_argument('--messages', type=int, default=5000, help='corpus size')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'signal-bench'),
+                        help='where generated databases are kept (default: %(default)s)')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', help='earlier results JSON to compare with')
+    parser.add_argument('--threshold', type=float, default=10.0, help='regression threshold in percent')
+    args = parser.parse_args()
+    # Per-signal INFO logs would dominate the timings
+    logging.disable(logging.INFO)
+    # Inserts are made unique by appending digits to corpus entries, which
+    # would all look like near-duplicates of each other
+    db._near_duplicates.tolerance = 0
+
+    sizes = [10000] if args.quick else [int(size) for size in args.rows.split(',')]
+    seconds = 0.5 if args.quick else args.seconds
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    messages = generate_messages(args.messages, SEED)
+    signals = signal_messages(messages)
+    signal_posts = [(channel, text) for channel, text in messages
+                    if is_candidate_signal(text, channel) and parse_signal(text, channel)['entry']]
+    results = {}
+
+    print("⏱️ parser")
+    results.update(bench_parser(messages, seconds))
+    print("⏱️ message_store")
+    results.update(bench_message_store(signals, seconds))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        check_v1_database(os.path.join(scratch, 'signals_v1.db'), signals[0])
+        use_database(os.path.join(scratch, 'signals.db'))
+        print("⏱️ save_signal")
+        results.update(bench_save_signal(signals))
+        print("⏱️ dedupe")
+        results.update(bench_dedupe(signals, seconds))
+        print("⏱️ outcomes")
+        check_outcomes()
+        for open_signals in OUTCOME_OPEN_SIGNALS:
+            results.update(bench_outcomes(open_signals, seconds))
+
+        print("⏱️ bot burst")
+        results.update(bench_bot_burst(signal_posts, scratch))
+
+        server = load_server()
+        if server is not None:
+            print("⏱️ webhook")
+            results.update(bench_webhook(server, messages))
+        db.close_pool()
+
+    for rows in sizes:
+        print(f"⏱️ api_signals at {rows:,} rows")
+        results.update(bench_api_signals(server, sized_database(args.data_dir, rows), rows))
+
+    print("⏱️ startup")
+    modules = ['core', 'Bot'] + (['server'] if server is not None else [])
+    results.update(bench_startup(sized_database(args.data_dir, sizes[0]), modules))
+
+    report = {
+        'meta': {'commit': git_commit(), 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                 'platform': platform.platform(), 'seed': SEED, 'messages': args.messages,
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': {metric: round(value, 3) for metric, value in results.items()}
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare and compare(report['results'], args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
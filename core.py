@@ -0,0 +1,68 @@
+"""Signal pipeline shared by server.py and Bot.py
+
+Both entry points start up the same way and run every channel post through
+the same prefilter -> parse -> save steps, so a change to the pipeline
+reaches the webhook and the polling bot together. Edited posts go through
+ingest_edit, which re-parses just that message and updates the signal
+stored from it in place.
+
+Keep this module light to import: it is on the cold-start path of both
+processes. Telegram and HTTP client libraries are imported where they are
+first used, not here.
+"""
+import logging
+
+import metrics
+from db import init_db, save_signal, find_signal_by_message, update_signal
+from prefilter import is_candidate_signal, load_channel_filters
+from signal_parser import parse_signal
+from symbols import load_instruments
+
+logger = logging.getLogger(__name__)
+
+
+def startup():
+    """Open the database and load the channel filters and instruments; schema work only runs when the stored version is behind"""
+    init_db()
+    load_channel_filters()
+    load_instruments()
+
+
+def ingest_post(text, channel_name, chat_id=None, message_id=None):
+    """Prefilter, parse and save one channel post; return the signal if it was stored"""
+    metrics.MESSAGES.inc(channel_name)
+    # Signal keywords, minus commentary
+    if not is_candidate_signal(text, channel_name):
+        metrics.REJECTED.inc('prefilter')
+        return None
+
+    with metrics.PARSE_SECONDS.time():
+        signal = parse_signal(text, channel_name)
+    if not (signal['pair'] and (signal['entry'] or signal['tp1'])):
+        metrics.REJECTED.inc('incomplete')
+        return None
+    # Lets an edit of this post find the row
+    signal['chat_id'], signal['message_id'] = chat_id, message_id
+    return signal if save_signal(signal) else None
+
+
+def ingest_edit(text, channel_name, chat_id, message_id):
+    """Re-parse one edited channel post
+
+    The signal stored from the post is updated in place (and SIGNAL_UPDATED
+    published); a post that was not stored, say because its first version
+    had no entry yet, gets a fresh chance through ingest_post. Returns the
+    signal only when the edit stored a new one.
+    """
+    stored = find_signal_by_message(chat_id, message_id)
+    if stored is None:
+        return ingest_post(text, channel_name, chat_id, message_id)
+
+    with metrics.PARSE_SECONDS.time():
+        signal = parse_signal(text, channel_name)
+    if not (signal['pair'] and signal['entry']):
+        # An edit that lost the pair or entry leaves the stored signal as it was
+        metrics.REJECTED.inc('incomplete')
+        return None
+    update_signal(stored, signal)
+    return None
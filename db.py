@@ -0,0 +1,725 @@
+"""Shared SQLite access layer for Bot.py and server.py
+
+Connections are opened once, tuned with WAL journaling and pragmas, and
+handed out from a small pool instead of being opened and closed on every
+call. Each connection keeps sqlite3's prepared-statement cache warm for the
+module-level SQL below, so repeated queries skip re-preparing.
+
+WAL lets the web process read while the bot worker writes, so API reads no
+longer queue behind inserts. Signal and security-log inserts go through a
+GroupCommitWriter so bursts share one commit, and duplicate checks are
+answered from an in-memory DedupeIndex before touching the database, with a
+NearDuplicateIndex for re-posts at a slightly different entry. Each
+committed signal is published on the in-process event bus, and so is each
+in-place update of a signal from its edited post.
+"""
+import os
+import re
+import time
+import atexit
+import queue
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from writer import GroupCommitWriter
+from message_store import message_hash, pack_message, unpack_message
+from dedupe import DedupeIndex, NearDuplicateIndex, DEDUPE_WINDOW
+from events import bus, SIGNAL_SAVED, SIGNAL_UPDATED, SECURITY_LOGGED
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.getenv('SIGNALS_DB', 'signals.db')
+POOL_SIZE = int(os.getenv('SIGNALS_DB_POOL_SIZE', '8'))
+# Signals created longer ago than this (backfilled history, rows migrated
+# from v1) are stored and counted but never alerted on or streamed as new
+LIVE_SIGNAL_MAX_AGE = float(os.getenv('LIVE_SIGNAL_MAX_AGE_SECONDS', '3600'))
+
+PRAGMAS = [
+    # Takes effect only in a new file (it must precede WAL mode), so that
+    # archive.py --compact can hand freed pages back without a full VACUUM
+    'PRAGMA auto_vacuum=INCREMENTAL',
+    'PRAGMA journal_mode=WAL',
+    # Safe with WAL: a crash can lose the last commits but never corrupts
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',
+]
+
+# Schema version 2 stores prices as REAL, adds a UTC epoch created_at and
+# indexes for the API query shapes. Version 1 databases keep working (SQLite
+# converts values on insert) until migrate.py rebuilds them.
+# Version 3 leaves signals as it is and records that init_db has created
+# every other table, index and trigger, so later boots skip the DDL. Bump it
+# whenever init_db gains a table.
+# Version 4 indexes performance by signal_id for the outcome tracker.
+# Version 5 adds the Telegram chat_id and message_id of each signal's post
+# (plain ALTER TABLE ADD COLUMNs, no copy) so edits can find their row.
+# Version 6 moves raw text out of signals: new rows keep a message_hash into
+# the compressed message_store table, and archive.py --compact moves the
+# text of older rows there.
+SIGNALS_LAYOUT_VERSION = 2
+SCHEMA_VERSION = 6
+
+SIGNALS_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS {table}
+                       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        channel_name TEXT,
+                        pair TEXT,
+                        direction TEXT,
+                        entry REAL,
+                        tp1 REAL, tp2 REAL, tp3 REAL, tp4 REAL, tp5 REAL, tp6 REAL,
+                        sl REAL,
+                        leverage REAL,
+                        timestamp TEXT,
+                        created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                        signal_hash TEXT UNIQUE,
+                        message_text TEXT,
+                        chat_id INTEGER,
+                        message_id INTEGER,
+                        message_hash TEXT)'''
+# Added to v2 tables in place by create_schema, with their types
+ADDED_COLUMNS = {'chat_id': 'INTEGER', 'message_id': 'INTEGER', 'message_hash': 'TEXT'}
+
+SIGNALS_INDEXES_SQL = [
+    'CREATE INDEX IF NOT EXISTS idx_signals_created_at ON {table} (created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_signals_pair_created_at ON {table} (pair, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_signals_channel_created_at ON {table} (channel_name, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_signals_direction_created_at ON {table} (direction, created_at)',
+    # Partial: backfilled and migrated rows have no message to edit
+    'CREATE INDEX IF NOT EXISTS idx_signals_message ON {table} (chat_id, message_id) WHERE message_id IS NOT NULL',
+    # Whether a stored body is still referenced, for archive.py
+    'CREATE INDEX IF NOT EXISTS idx_signals_message_hash ON {table} (message_hash) WHERE message_hash IS NOT NULL',
+]
+
+SECURITY_LOGS_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS security_logs
+                             (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              event_type TEXT,
+                              description TEXT,
+                              timestamp TEXT,
+                              severity TEXT)'''
+PERFORMANCE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS performance
+                           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            signal_id INTEGER,
+                            tp_hit TEXT,
+                            sl_hit BOOLEAN,
+                            pips_gained REAL,
+                            update_time TEXT,
+                            FOREIGN KEY(signal_id) REFERENCES signals(id))'''
+PERFORMANCE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS idx_performance_signal_id ON performance (signal_id)'
+# Raw message text by content hash, see message_store.py
+MESSAGE_STORE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS message_store
+                             (hash TEXT PRIMARY KEY,
+                              body BLOB NOT NULL)'''
+
+PRICE_COLUMNS = ['entry', 'tp1', 'tp2', 'tp3', 'tp4', 'tp5', 'tp6', 'sl', 'leverage']
+
+# Counters behind get_stats, kept current by triggers in the same transaction
+# as every insert, update or delete, whichever process does the write.
+# (scope, key): ('total', ''), ('direction', 'BUY'), ('pair', 'XAUUSD'),
+# ('channel', name) and ('severity', 'CRITICAL') for security_logs.
+# ('edits', '') counts in-place updates of stored signals, so readers in the
+# other process can tell the data changed without a new id.
+STATS_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS stats_counters
+                     (scope TEXT NOT NULL,
+                      key TEXT NOT NULL,
+                      count INTEGER NOT NULL DEFAULT 0,
+                      PRIMARY KEY (scope, key)) WITHOUT ROWID'''
+
+_COUNT_SIGNAL = '''INSERT INTO stats_counters (scope, key, count)
+                   VALUES ('total', '', {delta}),
+                          ('direction', COALESCE({row}.direction, ''), {delta}),
+                          ('pair', COALESCE({row}.pair, ''), {delta}),
+                          ('channel', COALESCE({row}.channel_name, ''), {delta})
+                   ON CONFLICT (scope, key) DO UPDATE SET count = count + excluded.count;'''
+_COUNT_SECURITY_LOG = '''INSERT INTO stats_counters (scope, key, count)
+                         VALUES ('severity', COALESCE({row}.severity, ''), {delta})
+                         ON CONFLICT (scope, key) DO UPDATE SET count = count + excluded.count;'''
+
+STATS_TRIGGERS_SQL = {
+    'signals_stats_insert': f'''CREATE TRIGGER IF NOT EXISTS signals_stats_insert AFTER INSERT ON signals BEGIN
+        {_COUNT_SIGNAL.format(row='NEW', delta=1)}
+    END''',
+    'signals_stats_delete': f'''CREATE TRIGGER IF NOT EXISTS signals_stats_delete AFTER DELETE ON signals BEGIN
+        {_COUNT_SIGNAL.format(row='OLD', delta=-1)}
+    END''',
+    'signals_stats_update': f'''CREATE TRIGGER IF NOT EXISTS signals_stats_update
+        AFTER UPDATE OF direction, pair, channel_name ON signals BEGIN
+        {_COUNT_SIGNAL.format(row='OLD', delta=-1)}
+        {_COUNT_SIGNAL.format(row='NEW', delta=1)}
+    END''',
+    'signals_edits': f'''CREATE TRIGGER IF NOT EXISTS signals_edits
+        AFTER UPDATE OF pair, direction, {', '.join(PRICE_COLUMNS)}, message_text ON signals BEGIN
+        INSERT INTO stats_counters (scope, key, count) VALUES ('edits', '', 1)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + 1;
+    END''',
+    'security_logs_stats_insert': f'''CREATE TRIGGER IF NOT EXISTS security_logs_stats_insert AFTER INSERT ON security_logs BEGIN
+        {_COUNT_SECURITY_LOG.format(row='NEW', delta=1)}
+    END''',
+    'security_logs_stats_delete': f'''CREATE TRIGGER IF NOT EXISTS security_logs_stats_delete AFTER DELETE ON security_logs BEGIN
+        {_COUNT_SECURITY_LOG.format(row='OLD', delta=-1)}
+    END''',
+}
+
+SIGNAL_COLUMNS = (['id', 'channel_name', 'pair', 'direction'] + PRICE_COLUMNS +
+                  ['timestamp', 'created_at', 'signal_hash', 'message_text'] + list(ADDED_COLUMNS))
+V1_SIGNAL_COLUMNS = [column for column in SIGNAL_COLUMNS if column != 'created_at' and column not in ADDED_COLUMNS]
+
+INSERT_SIGNAL_SQL = '''INSERT INTO signals
+                       (channel_name, pair, direction, entry, tp1, tp2, tp3, tp4, tp5, tp6, sl, leverage, timestamp, signal_hash,
+                        chat_id, message_id, message_hash)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+# Columns every layout has, for v1 tables; the text stays inline until migrated
+INSERT_SIGNAL_V1_SQL = '''INSERT INTO signals
+                          (channel_name, pair, direction, entry, tp1, tp2, tp3, tp4, tp5, tp6, sl, leverage, timestamp,
+                           signal_hash, message_text)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+# What an edit can change; a re-parse that leaves these alone is not written
+EDITED_COLUMNS = ['pair', 'direction'] + PRICE_COLUMNS + ['signal_hash']
+INSERT_MESSAGE_SQL = "INSERT OR IGNORE INTO message_store (hash, body) VALUES (?, ?)"
+SELECT_MESSAGE_SQL = "SELECT * FROM signals WHERE chat_id = ? AND message_id = ?"
+UPDATE_SIGNAL_SQL = f'''UPDATE signals SET pair = ?, direction = ?, {', '.join(f'{column} = ?' for column in PRICE_COLUMNS)},
+                        signal_hash = ?, message_text = NULL, message_hash = ? WHERE id = ?'''
+SAVE_CURSOR_SQL = '''INSERT INTO event_cursors (consumer, last_id) VALUES (?, ?)
+                     ON CONFLICT (consumer) DO UPDATE SET last_id = excluded.last_id'''
+INSERT_SECURITY_LOG_SQL = '''INSERT INTO security_logs (event_type, description, timestamp, severity)
+                             VALUES (?, ?, ?, ?)'''
+INSERT_OUTCOME_SQL = '''INSERT INTO performance (signal_id, tp_hit, sl_hit, pips_gained, update_time)
+                        VALUES (?, ?, ?, ?, ?)'''
+OUTCOME_COLUMNS = ['id', 'pair', 'direction', 'entry', 'tp1', 'tp2', 'tp3', 'tp4', 'tp5', 'tp6', 'sl', 'created_at']
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+def open_connection(path=None):
+    """Open a tuned connection; most callers want connection() instead"""
+    conn = sqlite3.connect(path or DB_PATH, timeout=10, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for the calling thread"""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = open_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def close_pool():
+    """Close every idle pooled connection"""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+_writer = GroupCommitWriter(connection)
+# Set by init_db: signals still has the v1 layout (no created_at) until migrate.py runs
+_signals_v1 = False
+_dedupe = DedupeIndex()
+_near_duplicates = NearDuplicateIndex()
+
+
+def writer_queue_depth():
+    return _writer.queue_depth()
+
+
+def shutdown():
+    """Flush queued writes and close pooled connections"""
+    _writer.stop()
+    close_pool()
+
+
+atexit.register(shutdown)
+
+
+def init_db():
+    """Initialize the database, creating tables only when the stored schema version is behind"""
+    global _signals_v1
+    with connection() as conn:
+        version = schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            logger.info(f"✅ Database schema v{version} is current")
+        else:
+            create_schema(conn, version)
+            logger.info("✅ Database initialized successfully")
+        _signals_v1 = schema_version(conn) < SIGNALS_LAYOUT_VERSION and table_exists(conn, 'signals')
+
+    load_dedupe_index()
+
+
+def create_schema(conn, version):
+    """Create whatever is missing and record SCHEMA_VERSION (unless signals still needs migrate.py)"""
+    c = conn.cursor()
+
+    # Signals table
+    signals_current = True
+    if table_exists(conn, 'signals'):
+        if version < SIGNALS_LAYOUT_VERSION:
+            logger.warning("⚠️ signals table is on schema v1, run python migrate.py to upgrade it")
+            signals_current = False
+    else:
+        c.execute(SIGNALS_TABLE_SQL.format(table='signals'))
+        for index_sql in SIGNALS_INDEXES_SQL:
+            c.execute(index_sql.format(table='signals'))
+    if signals_current:
+        # v2-v5 tables: new columns are appended without rewriting rows
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(signals)')}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in columns:
+                c.execute(f'ALTER TABLE signals ADD COLUMN {column} {column_type}')
+        for index_sql in SIGNALS_INDEXES_SQL:
+            c.execute(index_sql.format(table='signals'))
+
+    # Security logs table
+    c.execute(SECURITY_LOGS_TABLE_SQL)
+
+    # Performance tracking
+    c.execute(PERFORMANCE_TABLE_SQL)
+    c.execute(PERFORMANCE_INDEX_SQL)
+
+    # Raw message text
+    c.execute(MESSAGE_STORE_TABLE_SQL)
+
+    # Last event each consumer (e.g. the notifier) has handled
+    c.execute('''CREATE TABLE IF NOT EXISTS event_cursors
+                 (consumer TEXT PRIMARY KEY,
+                  last_id INTEGER NOT NULL)''')
+
+    # Stats counters, derived from history the first time they are created
+    needs_rebuild = not table_exists(conn, 'stats_counters')
+    c.execute(STATS_TABLE_SQL)
+    for trigger_sql in STATS_TRIGGERS_SQL.values():
+        c.execute(trigger_sql)
+    if needs_rebuild:
+        rebuild_stats_counters(conn)
+
+    if signals_current:
+        c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.commit()
+
+
+def load_dedupe_index():
+    """Fill the dedupe index with the most recent signal hashes"""
+    with connection() as conn:
+        rows = conn.execute("SELECT signal_hash FROM signals ORDER BY id DESC LIMIT ?",
+                            (_dedupe.max_entries,)).fetchall()
+    _dedupe.load(row['signal_hash'] for row in reversed(rows))
+    if _signals_v1:
+        # No created_at to find recent entries by; the index fills as signals arrive
+        _near_duplicates.load(())
+        logger.info(f"✅ Dedupe index loaded with {len(_dedupe)} signal hashes")
+        return
+    with connection() as conn:
+        recent = conn.execute("""SELECT pair, direction, entry, created_at FROM signals
+                                 WHERE created_at >= ? AND entry IS NOT NULL ORDER BY created_at""",
+                              (int(time.time() - _near_duplicates.window),)).fetchall()
+    _near_duplicates.load(((row['pair'], row['direction']), row['entry'], row['created_at']) for row in recent)
+    logger.info(f"✅ Dedupe index loaded with {len(_dedupe)} signal hashes and {len(_near_duplicates)} recent entries")
+
+
+def rebuild_stats_counters(conn):
+    """Re-derive stats_counters from signals and security_logs
+
+    Runs inside the caller's transaction, which holds the write lock for a
+    full scan of both tables.
+    """
+    logger.info("🔢 Rebuilding stats counters from history")
+    conn.execute("DELETE FROM stats_counters WHERE scope != 'edits'")
+    conn.execute("INSERT INTO stats_counters (scope, key, count) SELECT 'total', '', COUNT(*) FROM signals")
+    for scope, column in (('direction', 'direction'), ('pair', 'pair'), ('channel', 'channel_name')):
+        conn.execute(f"""INSERT INTO stats_counters (scope, key, count)
+                         SELECT '{scope}', COALESCE({column}, ''), COUNT(*) FROM signals
+                         GROUP BY COALESCE({column}, '')""")
+    conn.execute("""INSERT INTO stats_counters (scope, key, count)
+                    SELECT 'severity', COALESCE(severity, ''), COUNT(*) FROM security_logs
+                    GROUP BY COALESCE(severity, '')""")
+
+
+def table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?|\.\d+')
+
+
+def to_price(value):
+    """First number in a parsed price ('2340-2350' -> 2340.0), or None"""
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    match = _NUMBER.search(value)
+    return float(match.group()) if match else None
+
+
+def is_live_signal(signal):
+    created_at = signal.get('created_at')
+    return created_at is None or created_at >= time.time() - LIVE_SIGNAL_MAX_AGE
+
+
+def generate_signal_hash(pair, entry, created_at=None):
+    """Hash behind the UNIQUE duplicate guard: pair, entry as a number and the dedupe window it falls in"""
+    price = to_price(entry)
+    hash_string = f"{pair}_{entry if price is None else price}"
+    if DEDUPE_WINDOW:
+        hash_string += f"_{int((time.time() if created_at is None else created_at) // DEDUPE_WINDOW)}"
+    return hashlib.md5(hash_string.encode()).hexdigest()
+
+
+def save_signal(signal):
+    """Save signal to database"""
+    if not signal['pair'] or not signal['entry']:
+        metrics.REJECTED.inc('incomplete')
+        return False
+
+    signal_hash = generate_signal_hash(signal['pair'], signal['entry'])
+    prices = [to_price(signal[column]) for column in PRICE_COLUMNS]
+
+    # Check for duplicates: the same entry, or one within tolerance posted moments ago
+    with metrics.DEDUPE_SECONDS.time():
+        duplicate = signal_hash in _dedupe or (
+            prices[0] is not None and _near_duplicates.check_and_add((signal['pair'], signal['direction']), prices[0]))
+    if duplicate:
+        logger.info(f"⚠️ DUPLICATE DETECTED: {signal['pair']} @ {signal['entry']}")
+        metrics.DUPLICATES.inc(signal['channel'])
+        return False
+
+    text_hash = message_hash(signal['raw_text'])
+    row = {'channel_name': signal['channel'], 'pair': signal['pair'], 'direction': signal['direction'],
+           **dict(zip(PRICE_COLUMNS, prices)),
+           'timestamp': signal['timestamp'], 'signal_hash': signal_hash, 'message_text': signal['raw_text'],
+           'chat_id': signal.get('chat_id'), 'message_id': signal.get('message_id'), 'message_hash': text_hash}
+
+    def publish(row_id):
+        # Runs on the writer thread right after commit, so events stay in id order
+        bus.publish(SIGNAL_SAVED, dict(row, id=row_id, created_at=int(time.time())))
+
+    if _signals_v1:
+        row_id = _writer.submit(INSERT_SIGNAL_V1_SQL,
+                                (signal['channel'], signal['pair'], signal['direction'], *prices,
+                                 signal['timestamp'], signal_hash, signal['raw_text']),
+                                unique=True, on_commit=publish).result()
+    else:
+        # The text goes in first (a body left over by a duplicate is dropped by
+        # archive.py --compact); the UNIQUE signal_hash constraint has the final say
+        _writer.submit(INSERT_MESSAGE_SQL, (text_hash, pack_message(signal['raw_text'])))
+        row_id = _writer.submit(INSERT_SIGNAL_SQL,
+                                (signal['channel'], signal['pair'], signal['direction'], *prices,
+                                 signal['timestamp'], signal_hash, row['chat_id'], row['message_id'], text_hash),
+                                unique=True, on_commit=publish).result()
+    _dedupe.add(signal_hash)
+    saved = row_id is not None
+    if saved:
+        logger.info(f"✅ SIGNAL SAVED: {signal['pair']} {signal['direction']} @ {signal['entry']} from {signal['channel']}")
+        metrics.SIGNALS_SAVED.inc(signal['channel'])
+    else:
+        logger.info(f"⚠️ DUPLICATE DETECTED: {signal['pair']} @ {signal['entry']}")
+        metrics.DUPLICATES.inc(signal['channel'])
+    return saved
+
+
+def find_signal_by_message(chat_id, message_id):
+    """The signal stored from Telegram message (chat_id, message_id), or None"""
+    if _signals_v1:
+        # v1 rows do not record their message
+        return None
+    with connection() as conn:
+        row = conn.execute(SELECT_MESSAGE_SQL, (chat_id, message_id)).fetchone()
+    return dict(row) if row else None
+
+
+def update_signal(stored, signal):
+    """Rewrite the stored row from a re-parse of its edited post; return the new row, or None if nothing changed
+
+    Edits are rare, so this is a small transaction of its own rather than a
+    group-commit record. The stats triggers move the counters along, and
+    SIGNAL_UPDATED carries the new row with its previous direction.
+    """
+    prices = [to_price(signal[column]) for column in PRICE_COLUMNS]
+    signal_hash = generate_signal_hash(signal['pair'], signal['entry'], stored['created_at'])
+    text_hash = message_hash(signal['raw_text'])
+    row = dict(stored, pair=signal['pair'], direction=signal['direction'], **dict(zip(PRICE_COLUMNS, prices)),
+               signal_hash=signal_hash, message_text=None, message_hash=text_hash)
+    if all(row[column] == stored[column] for column in EDITED_COLUMNS):
+        return None
+    try:
+        with connection() as conn:
+            conn.execute(INSERT_MESSAGE_SQL, (text_hash, pack_message(signal['raw_text'])))
+            conn.execute(UPDATE_SIGNAL_SQL, (row['pair'], row['direction'], *prices, signal_hash,
+                                             text_hash, stored['id']))
+            conn.commit()
+    except sqlite3.IntegrityError:
+        # The edit turned it into a copy of another stored signal; keep the row as it was
+        logger.info(f"⚠️ DUPLICATE DETECTED: edit of signal {stored['id']} matches {signal['pair']} @ {signal['entry']}")
+        metrics.DUPLICATES.inc(stored['channel_name'])
+        return None
+    _dedupe.add(signal_hash)
+    key, previous_key = (row['pair'], row['direction']), (stored['pair'], stored['direction'])
+    if (key, row['entry']) != (previous_key, stored['entry']):
+        # Near-duplicate checks should match the entry the signal has now
+        if stored['entry'] is not None:
+            _near_duplicates.discard(previous_key, stored['entry'])
+        if row['entry'] is not None and stored['created_at'] >= time.time() - _near_duplicates.window:
+            _near_duplicates.add(key, row['entry'], stored['created_at'])
+    logger.info(f"✏️ SIGNAL UPDATED: {row['pair']} {row['direction']} @ {row['entry']} (id {stored['id']})")
+    metrics.SIGNALS_EDITED.inc(stored['channel_name'])
+    row['message_text'] = signal['raw_text']
+    bus.publish(SIGNAL_UPDATED, dict(row, previous_direction=stored['direction']))
+    return row
+
+
+def log_security_event(event_type, description, severity):
+    """Record a security event; written by the next group commit"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log = {'event_type': event_type, 'description': description, 'timestamp': timestamp, 'severity': severity}
+    _writer.submit(INSERT_SECURITY_LOG_SQL, (event_type, description, timestamp, severity),
+                   on_commit=lambda row_id: bus.publish(SECURITY_LOGGED, dict(log, id=row_id)))
+    logger.warning(f"🚨 SECURITY ALERT [{severity}]: {event_type} - {description}")
+
+
+def fill_message_text(conn, signals):
+    """Set message_text on rows that keep their text in message_store"""
+    hashes = list({signal['message_hash'] for signal in signals
+                   if signal.get('message_text') is None and signal.get('message_hash')})
+    bodies = {}
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        for row in conn.execute(f"SELECT hash, body FROM message_store WHERE hash IN ({', '.join('?' * len(chunk))})",
+                                chunk):
+            bodies[row['hash']] = unpack_message(row['body'])
+    for signal in signals:
+        if signal.get('message_text') is None and signal.get('message_hash') in bodies:
+            signal['message_text'] = bodies[signal['message_hash']]
+    return signals
+
+
+def query_signals(filters=None, start=None, end=None, before_id=None, since_id=None, fields=None, limit=50):
+    """Signals matching filters, newest first
+
+    filters maps columns (pair, channel_name, direction) to values; start and
+    end bound created_at (epoch seconds, end exclusive). Rows are ordered by
+    (created_at, id), the tail of every query index, so any page is a single
+    index range scan however deep it is. before_id pages back from that row;
+    since_id returns the limit rows right after it. message_text comes from
+    message_store for rows that keep it there.
+
+    A schema v1 table has no created_at: rows are ordered by id alone and
+    start/end raise ValueError until migrate.py has run.
+    """
+    if _signals_v1:
+        return _query_signals_v1(filters, start, end, before_id, since_id, fields, limit)
+
+    where, params = [], []
+    for column, value in (filters or {}).items():
+        where.append(f'{column} = ?')
+        params.append(value)
+    if start is not None:
+        where.append('created_at >= ?')
+        params.append(start)
+    if end is not None:
+        where.append('created_at < ?')
+        params.append(end)
+
+    order = 'DESC'
+    try:
+        with connection() as conn:
+            if before_id is not None or since_id is not None:
+                # Position of the cursor row (or its nearest neighbour if deleted)
+                if before_id is not None:
+                    cursor_id, op = before_id, '<'
+                    row = conn.execute("SELECT created_at FROM signals WHERE id <= ? ORDER BY id DESC LIMIT 1",
+                                       (before_id,)).fetchone()
+                else:
+                    cursor_id, op, order = since_id, '>', 'ASC'
+                    row = conn.execute("SELECT created_at FROM signals WHERE id >= ? ORDER BY id LIMIT 1",
+                                       (since_id,)).fetchone()
+                if row is None:
+                    return []
+                where.append(f'(created_at, id) {op} (?, ?)')
+                params += [row['created_at'], cursor_id]
+
+            columns = list(fields) if fields else ['*']
+            lookup_text = not fields or 'message_text' in fields
+            if fields and lookup_text and 'message_hash' not in fields:
+                columns.append('message_hash')
+            sql = f"SELECT {', '.join(columns)} FROM signals"
+            if where:
+                sql += ' WHERE ' + ' AND '.join(where)
+            sql += f' ORDER BY created_at {order}, id {order} LIMIT ?'
+            signals = [dict(row) for row in conn.execute(sql, params + [limit]).fetchall()]
+            if lookup_text:
+                fill_message_text(conn, signals)
+    except Exception as e:
+        logger.error(f"Error querying signals: {e}")
+        return []
+
+    if fields and len(columns) > len(fields):
+        for signal in signals:
+            del signal['message_hash']
+    if order == 'ASC':
+        signals.reverse()
+    return signals
+
+
+def _query_signals_v1(filters, start, end, before_id, since_id, fields, limit):
+    """query_signals on a schema v1 table, in id order"""
+    if start is not None or end is not None:
+        raise ValueError("start/end need the created_at column; run migrate.py")
+    where, params = [], []
+    for column, value in (filters or {}).items():
+        where.append(f'{column} = ?')
+        params.append(value)
+    order = 'DESC'
+    if before_id is not None:
+        where.append('id < ?')
+        params.append(before_id)
+    elif since_id is not None:
+        where.append('id > ?')
+        params.append(since_id)
+        order = 'ASC'
+
+    sql = f"SELECT {', '.join(fields) if fields else '*'} FROM signals"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY id {order} LIMIT ?'
+    try:
+        with connection() as conn:
+            signals = [dict(row) for row in conn.execute(sql, params + [limit]).fetchall()]
+    except Exception as e:
+        logger.error(f"Error querying signals: {e}")
+        return []
+    if order == 'ASC':
+        signals.reverse()
+    return signals
+
+
+def signal_columns():
+    """Columns the signals table has in this database (fewer on schema v1)"""
+    return V1_SIGNAL_COLUMNS if _signals_v1 else SIGNAL_COLUMNS
+
+
+def get_signals_after(last_id, limit=100):
+    """Signals with id > last_id, oldest first"""
+    with connection() as conn:
+        rows = conn.execute("SELECT * FROM signals WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)).fetchall()
+        return fill_message_text(conn, [dict(row) for row in rows])
+
+
+def get_max_signal_id():
+    with connection() as conn:
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM signals").fetchone()[0]
+
+
+def get_latest_ids():
+    """(newest signal id, newest security log id, signal edits so far), three index lookups"""
+    with connection() as conn:
+        row = conn.execute("""SELECT (SELECT COALESCE(MAX(id), 0) FROM signals),
+                                     (SELECT COALESCE(MAX(id), 0) FROM security_logs),
+                                     (SELECT COALESCE(MAX(count), 0) FROM stats_counters
+                                      WHERE scope = 'edits' AND key = '')""").fetchone()
+    return row[0], row[1], row[2]
+
+
+def load_cursor(consumer):
+    """Last signal id consumer has handled, or None if it never ran"""
+    with connection() as conn:
+        row = conn.execute("SELECT last_id FROM event_cursors WHERE consumer = ?", (consumer,)).fetchone()
+    return row['last_id'] if row else None
+
+
+def save_cursor(consumer, last_id):
+    """Persist consumer's position with the next group commit"""
+    _writer.submit(SAVE_CURSOR_SQL, (consumer, last_id))
+
+
+def get_signals_since(created_at):
+    """Price levels of signals created at or after created_at, oldest first"""
+    with connection() as conn:
+        rows = conn.execute(f"""SELECT {', '.join(OUTCOME_COLUMNS)} FROM signals
+                                WHERE created_at >= ? ORDER BY created_at, id""", (created_at,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_outcome_signals_after(last_id, limit=100):
+    """Price levels of signals with id > last_id, oldest first (no message text)"""
+    with connection() as conn:
+        rows = conn.execute(f"""SELECT {', '.join(OUTCOME_COLUMNS)} FROM signals
+                                WHERE id > ? ORDER BY id LIMIT ?""", (last_id, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_outcomes(signal_ids):
+    """{signal_id: set of levels already hit ('TP1'..'TP6', 'SL')}"""
+    outcomes = {}
+    signal_ids = list(signal_ids)
+    with connection() as conn:
+        for start in range(0, len(signal_ids), 500):
+            chunk = signal_ids[start:start + 500]
+            rows = conn.execute(f"""SELECT signal_id, tp_hit, sl_hit FROM performance
+                                    WHERE signal_id IN ({', '.join('?' * len(chunk))})""", chunk).fetchall()
+            for row in rows:
+                outcomes.setdefault(row['signal_id'], set()).add('SL' if row['sl_hit'] else row['tp_hit'])
+    return outcomes
+
+
+def record_outcome(signal_id, tp_hit, sl_hit, pips_gained, update_time):
+    """Store one TP or SL hit; written by the next group commit"""
+    _writer.submit(INSERT_OUTCOME_SQL, (signal_id, tp_hit, sl_hit, pips_gained, update_time))
+
+
+def get_security_logs(limit=20):
+    try:
+        with connection() as conn:
+            logs = conn.execute('''SELECT * FROM security_logs ORDER BY rowid DESC LIMIT ?''', (limit,)).fetchall()
+        return [dict(log) for log in logs]
+    except:
+        return []
+
+
+def get_stats(breakdown=False):
+    """Signal totals from stats_counters; breakdown adds per-pair and per-channel counts"""
+    scopes = ('total', 'direction', 'severity', 'pair', 'channel') if breakdown else ('total', 'direction', 'severity')
+    try:
+        with connection() as conn:
+            rows = conn.execute(f"""SELECT scope, key, count FROM stats_counters
+                                    WHERE scope IN ({', '.join('?' for _ in scopes)})""", scopes).fetchall()
+
+        counters = {}
+        for row in rows:
+            counters[(row['scope'], row['key'])] = row['count']
+
+        stats = {
+            'total_signals': counters.get(('total', ''), 0),
+            'buy_signals': counters.get(('direction', 'BUY'), 0),
+            'sell_signals': counters.get(('direction', 'SELL'), 0),
+            'critical_alerts': counters.get(('severity', 'CRITICAL'), 0)
+        }
+        if breakdown:
+            for scope, name in (('pair', 'pairs'), ('channel', 'channels')):
+                stats[name] = {key: count for (row_scope, key), count in counters.items()
+                               if row_scope == scope and count > 0}
+        return stats
+    except:
+        return {'total_signals': 0, 'buy_signals': 0, 'sell_signals': 0, 'critical_alerts': 0}
@@ -0,0 +1,163 @@
+"""In-process indexes of recently seen signals
+
+Loaded from signals.signal_hash at startup and updated on every insert, so
+the duplicate storms that follow one provider cross-posting into many
+channels are answered from memory instead of a SELECT.
+
+The index is bounded by DEDUPE_MAX_ENTRIES (oldest hashes are dropped first)
+and optionally by DEDUPE_TTL_HOURS. A hit is always a real duplicate; a miss
+only means "not seen recently", and the UNIQUE signal_hash constraint stays
+the final word on insert.
+
+NearDuplicateIndex catches the same call posted again with a slightly
+different entry ("2345.5", "2345.50", "2345.7" a minute later): per pair and
+direction it keeps the entry prices of the last DEDUPE_WINDOW_SECONDS in a
+sorted list, so finding one within DEDUPE_TOLERANCE_PCT of a new entry is a
+single bisect. Entries leave the index once they are older than the window,
+so the same price days later is a new signal.
+"""
+import os
+import time
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+from sortedcontainers import SortedList
+
+DEDUPE_MAX_ENTRIES = int(os.getenv('DEDUPE_MAX_ENTRIES', '50000'))
+DEDUPE_TTL = float(os.getenv('DEDUPE_TTL_HOURS', '0')) * 3600
+DEDUPE_WINDOW = float(os.getenv('DEDUPE_WINDOW_SECONDS', '300'))
+DEDUPE_TOLERANCE = float(os.getenv('DEDUPE_TOLERANCE_PCT', '0.05')) / 100
+
+
+class DedupeIndex:
+    """Bounded, optionally expiring set of signal hashes"""
+
+    def __init__(self, max_entries=DEDUPE_MAX_ENTRIES, ttl=DEDUPE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # hash -> time it was added, oldest first
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def __contains__(self, signal_hash):
+        with self._lock:
+            added = self._seen.get(signal_hash)
+            if added is None:
+                return False
+            if self.ttl and time.monotonic() - added > self.ttl:
+                del self._seen[signal_hash]
+                return False
+            return True
+
+    def add(self, signal_hash):
+        now = time.monotonic()
+        with self._lock:
+            if signal_hash in self._seen:
+                return
+            self._seen[signal_hash] = now
+            self._evict(now)
+
+    def load(self, hashes):
+        """Replace the contents with hashes, given oldest first"""
+        now = time.monotonic()
+        with self._lock:
+            self._seen.clear()
+            for signal_hash in hashes:
+                self._seen[signal_hash] = now
+            self._evict(now)
+
+    def _evict(self, now):
+        seen = self._seen
+        while len(seen) > self.max_entries:
+            seen.popitem(last=False)
+        if self.ttl:
+            while seen:
+                oldest_hash, added = next(iter(seen.items()))
+                if now - added <= self.ttl:
+                    break
+                del seen[oldest_hash]
+
+
+class NearDuplicateIndex:
+    """Entry prices seen in the last window seconds, per (pair, direction), matched within a relative tolerance"""
+
+    def __init__(self, tolerance=DEDUPE_TOLERANCE, window=DEDUPE_WINDOW):
+        self.tolerance = tolerance
+        self.window = window
+        # key -> SortedList of (price, seq); seq keeps equal prices apart
+        self._prices = {}
+        # (added, key, item), oldest first, for expiry
+        self._added = deque()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._added)
+
+    def check_and_add(self, key, price, now=None):
+        """True if key has an entry within tolerance of price in the window; otherwise remember price"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if self._find(key, price):
+                return True
+            self._add(key, price, now)
+            return False
+
+    def add(self, key, price, added=None):
+        """Remember price under key without checking it"""
+        added = time.time() if added is None else added
+        with self._lock:
+            self._add(key, price, added)
+
+    def discard(self, key, price):
+        """Forget one entry of key at price, e.g. when an edit moves a signal's entry"""
+        with self._lock:
+            prices = self._prices.get(key)
+            if not prices:
+                return
+            i = prices.bisect_left((price,))
+            if i < len(prices) and prices[i][0] == price:
+                del prices[i]
+                if not prices:
+                    del self._prices[key]
+
+    def load(self, entries):
+        """Replace the contents with (key, price, epoch time added) entries, given oldest first"""
+        with self._lock:
+            self._prices.clear()
+            self._added.clear()
+            for key, price, added in entries:
+                self._add(key, price, added)
+            self._expire(time.time())
+
+    def _find(self, key, price):
+        prices = self._prices.get(key)
+        if not prices:
+            return False
+        margin = abs(price) * self.tolerance
+        i = prices.bisect_left((price - margin,))
+        return i < len(prices) and prices[i][0] <= price + margin
+
+    def _add(self, key, price, added):
+        item = (price, next(self._seq))
+        prices = self._prices.get(key)
+        if prices is None:
+            prices = self._prices[key] = SortedList()
+        prices.add(item)
+        self._added.append((added, key, item))
+
+    def _expire(self, now):
+        added = self._added
+        while added and added[0][0] < now - self.window:
+            _, key, item = added.popleft()
+            # Gone already if it was discarded
+            prices = self._prices.get(key)
+            if prices is not None:
+                prices.discard(item)
+                if not prices:
+                    del self._prices[key]
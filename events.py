@@ -0,0 +1,62 @@
+"""In-process publish/subscribe for signal events
+
+Publishers never block: every subscriber owns a queue, and a subscriber
+whose bounded queue is full just misses that event (and is expected to
+catch up from the database). The notifier subscribes with an unbounded
+queue; live dashboard streams use bounded ones. Consumers that only need to
+know something changed (the API response cache) listen with a callback
+instead, which runs in the publishing thread and must return at once.
+"""
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_SAVED = 'signal.saved'
+# A stored signal was rewritten from an edited post (carries previous_direction)
+SIGNAL_UPDATED = 'signal.updated'
+SECURITY_LOGGED = 'security.logged'
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, *topics, maxsize=0):
+        """Return a queue that receives (topic, event) for every event published on topics from now on"""
+        subscription = queue.Queue(maxsize)
+        with self._lock:
+            # Copy on write so publish() can iterate without the lock
+            for topic in topics:
+                self._subscribers[topic] = self._subscribers.get(topic, ()) + (subscription,)
+        return subscription
+
+    def listen(self, callback, *topics):
+        """Call callback(topic, event) in the publisher's thread for every event published on topics"""
+        with self._lock:
+            for topic in topics:
+                self._subscribers[topic] = self._subscribers.get(topic, ()) + (callback,)
+        return callback
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in list(self._subscribers):
+                self._subscribers[topic] = tuple(s for s in self._subscribers[topic] if s is not subscription)
+
+    def subscriber_count(self, topic):
+        return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic, event):
+        for subscription in self._subscribers.get(topic, ()):
+            if callable(subscription):
+                subscription(topic, event)
+                continue
+            try:
+                subscription.put_nowait((topic, event))
+            except queue.Full:
+                logger.warning(f"⚠️ Subscriber queue full on {topic}, event dropped")
+
+
+bus = EventBus()
@@ -0,0 +1,128 @@
+"""Acknowledge-then-process ingestion of Telegram webhook updates
+
+The webhook only validates an update and queues it; parsing, persistence and
+replies to bot commands happen on a pool of worker threads. Telegram gets
+its 200 at once, so slow disk or a slow Bot API no longer makes it retry and
+pile up updates.
+
+Updates are sharded over the workers by chat id, which keeps each channel's
+posts in order. Every worker has its own bounded queue; when the target one
+is full the update is refused and the webhook answers 503, so Telegram
+backs off and redelivers later (backpressure instead of unbounded memory).
+
+Recently accepted update_ids are remembered, so a redelivery of an update
+that was already queued is acknowledged and dropped. Signals are deduped by
+signal_hash again on insert, so replays after a restart stay harmless too.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+
+from dedupe import DedupeIndex
+import metrics
+from profiler import webhook_profiler
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+SEEN_UPDATES = 10000
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+REJECTED = 'rejected'
+
+_STOP = object()
+
+
+def update_chat_id(update):
+    for key in ('channel_post', 'edited_channel_post', 'message', 'edited_message'):
+        if key in update:
+            return update[key].get('chat', {}).get('id')
+    return None
+
+
+class UpdateIngestor:
+    """Bounded, chat-sharded worker pool calling handler(update) for every new update"""
+
+    def __init__(self, handler, workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self._queues = [queue.Queue(max(1, queue_size // workers)) for _ in range(workers)]
+        self._threads = []
+        self._seen = DedupeIndex(max_entries=SEEN_UPDATES, ttl=0)
+        self._lock = threading.Lock()
+        self._counters = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'processed': 0, 'failed': 0}
+        self._max_depth = 0
+        self._max_wait = 0.0
+
+    def start(self):
+        for index, updates in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(updates,), name=f'webhook-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"📥 Webhook ingestion started with {self.workers} workers")
+
+    def stop(self, timeout=10):
+        """Process what is already queued, then stop the workers"""
+        if not self._threads:
+            return
+        for updates in self._queues:
+            updates.put((None, _STOP))
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+
+    def submit(self, update):
+        """Queue update; returns ACCEPTED, DUPLICATE or REJECTED (queue full)"""
+        update_id = update['update_id']
+        chat_id = update_chat_id(update)
+        updates = self._queues[hash(chat_id) % self.workers]
+        with self._lock:
+            if update_id in self._seen:
+                self._counters['duplicates'] += 1
+                return DUPLICATE
+            try:
+                updates.put_nowait((time.monotonic(), update))
+            except queue.Full:
+                self._counters['rejected'] += 1
+                return REJECTED
+            self._seen.add(update_id)
+            self._counters['accepted'] += 1
+            self._max_depth = max(self._max_depth, self.queue_depth())
+        return ACCEPTED
+
+    def queue_depth(self):
+        return sum(updates.qsize() for updates in self._queues)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                'queue_depth': self.queue_depth(),
+                'queue_capacity': sum(updates.maxsize for updates in self._queues),
+                'max_queue_depth': self._max_depth,
+                'max_wait_ms': round(self._max_wait * 1000, 1),
+                'workers': self.workers
+            })
+        return stats
+
+    def _run(self, updates):
+        while True:
+            queued_at, update = updates.get()
+            if update is _STOP:
+                return
+            wait = time.monotonic() - queued_at
+            try:
+                with metrics.WEBHOOK_PROCESS_SECONDS.time(), webhook_profiler():
+                    self.handler(update)
+                outcome = 'processed'
+            except Exception as e:
+                logger.error(f"❌ Error processing update {update.get('update_id')}: {e}")
+                outcome = 'failed'
+            with self._lock:
+                self._counters[outcome] += 1
+                self._max_wait = max(self._max_wait, wait)
@@ -0,0 +1,142 @@
+"""Append-only SIGNAL_TRADE journal
+
+Saved signals are appended to one text file per day,
+SIGNAL_TRADE_<YYYY-MM-DD>.txt, each starting with the date header. The day
+is the signal's own 'date', so a backfilled signal or one parsed just before
+midnight goes to the file its header names. The current day and the open
+file handle are kept in memory, so an append costs the same however much
+history exists; nothing is ever read back.
+
+With SIGNAL_JOURNAL_MAX_MB set, a day that outgrows the cap continues in
+SIGNAL_TRADE_<YYYY-MM-DD>.2.txt, .3.txt and so on. Writes are buffered and
+flushed every SIGNAL_JOURNAL_FLUSH_SECONDS and on exit.
+"""
+import os
+import atexit
+import logging
+import threading
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.getenv('SIGNAL_JOURNAL_DIR', '.')
+JOURNAL_MAX_BYTES = int(float(os.getenv('SIGNAL_JOURNAL_MAX_MB', '0')) * 1024 * 1024)
+JOURNAL_FLUSH_INTERVAL = float(os.getenv('SIGNAL_JOURNAL_FLUSH_SECONDS', '1'))
+
+
+def format_signal(signal):
+    lines = [
+        f"⏰ {signal['timestamp']} | 📍 {signal['channel']}",
+        f"💱 {signal['pair']} | {'🟢 BUY' if signal['direction'] == 'BUY' else '🔴 SELL'}",
+        f"Entry: {signal['entry']} | SL: {signal['sl']}"
+    ]
+    tps = [signal[f'tp{i}'] for i in range(1, 7) if signal[f'tp{i}']]
+    if tps:
+        lines.append(f"TP: {' | '.join(tps)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def file_date(day):
+    """YYYY-MM-DD of a signal's 'DD MONTH YYYY' date, for file names"""
+    try:
+        return datetime.strptime(day, '%d %B %Y').date().isoformat()
+    except ValueError:
+        return day.replace(' ', '_')
+
+
+class SignalJournal:
+    """Daily, optionally size-capped signal journal with scheduled flushes"""
+
+    def __init__(self, directory=JOURNAL_DIR, basename='SIGNAL_TRADE', max_bytes=JOURNAL_MAX_BYTES,
+                 flush_interval=JOURNAL_FLUSH_INTERVAL):
+        self.directory = directory
+        self.basename = basename
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._day = None
+        self._file_date = None
+        self._header = None
+        self._part = 1
+        self._size = 0
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name='journal-flush', daemon=True)
+        self._flusher.start()
+
+    def write(self, signal):
+        entry = format_signal(signal).encode()
+        with self._lock:
+            if signal['date'] != self._day:
+                self._open_day(signal['date'])
+            elif self.max_bytes and self._size + len(entry) > self.max_bytes:
+                self._open_part(self._part + 1)
+            self._file.write(entry)
+            self._size += len(entry)
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._file.flush()
+                self._dirty = False
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._day = None
+                self._file_date = None
+
+    def path(self, part=None):
+        part = self._part if part is None else part
+        suffix = f'.{part}' if part > 1 else ''
+        day = self._file_date or date.today().isoformat()
+        return os.path.join(self.directory, f'{self.basename}_{day}{suffix}.txt')
+
+    def _open_day(self, day):
+        self._day = day
+        self._file_date = file_date(day)
+        self._header = f"{'=' * 50}\n📅 {day}\n{'=' * 50}\n\n".encode()
+        # Resume today's last part after a restart
+        part = 1
+        while os.path.exists(self.path(part + 1)):
+            part += 1
+        self._open_part(part)
+
+    def _open_part(self, part):
+        if self._file is not None:
+            self._file.close()
+        self._part = part
+        path = self.path(part)
+        self._file = open(path, 'ab')
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(self._header)
+            self._size = len(self._header)
+        logger.info(f"📝 Journaling signals to {path}")
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing signal journal: {e}")
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def write_to_signal_file(signal):
+    """Append signal to today's journal file"""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = SignalJournal()
+                atexit.register(_journal.close)
+    _journal.write(signal)
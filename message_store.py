@@ -0,0 +1,49 @@
+"""Compressed, content-addressed storage for raw message text
+
+Signals keep only a message_hash; the text itself lives once per distinct
+content in the message_store table, so cross-posts of one message share a
+body and scans of signals never read message text.
+
+Channel posts are short, which plain zlib barely shrinks, so bodies are
+deflated against a preset dictionary of the words signals are made of. The
+first byte says how a body is stored: FORMAT_RAW (compression did not help)
+or FORMAT_ZDICT_V1. Never edit MESSAGE_ZDICT in place; a new dictionary
+needs a new format byte so stored bodies stay readable.
+"""
+import zlib
+import hashlib
+
+FORMAT_RAW = b'\x00'
+FORMAT_ZDICT_V1 = b'\x01'
+
+# Most frequent last: deflate reaches the end of the dictionary cheapest
+MESSAGE_ZDICT = (
+    'ANALYSIS RESISTANCE SUPPORT BREAKOUT TRENDLINE WEEKLY RESULTS PIPS PROFIT JOIN VIP '
+    'MOVE SL TO BREAKEVEN RISK MANAGEMENT SIGNAL ALERT CLOSE ALL POSITIONS NOW HIT ✅ 🔥 🟢 🔴 '
+    'XAGUSD US30 NAS100 GBPJPY USDJPY AUDCAD EURGBP GBPUSD EURUSD ETHUSDT SOLUSDT XRPUSDT BTCUSDT '
+    '/USDT GOLD XAUUSD LIMIT CROSS LEVERAGE 10X 20X DIRECTION: ENTRY ZONE: ENTRY PRICE: ENTER: '
+    'TAKE PROFIT 1: TAKE PROFIT 2: TAKE PROFIT 3: TARGET 1: TARGET 2: TARGET 3: STOPLOSS: STOP LOSS: '
+    'SHORT LONG SELL BUY NOW @ ENTRY: ENTRY TP1: TP2: TP3: TP4: SL: TP1 TP2 TP3 TP4 TP5 TP6 SL '
+).encode('utf-8')
+
+
+def message_hash(text):
+    """Content hash of text, the message_store key"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def pack_message(text):
+    raw = text.encode('utf-8')
+    compressor = zlib.compressobj(9, zdict=MESSAGE_ZDICT)
+    packed = compressor.compress(raw) + compressor.flush()
+    return FORMAT_ZDICT_V1 + packed if len(packed) < len(raw) else FORMAT_RAW + raw
+
+
+def unpack_message(body):
+    body = bytes(body)
+    if body[:1] == FORMAT_ZDICT_V1:
+        decompressor = zlib.decompressobj(zdict=MESSAGE_ZDICT)
+        return (decompressor.decompress(body[1:]) + decompressor.flush()).decode('utf-8')
+    if body[:1] == FORMAT_RAW:
+        return body[1:].decode('utf-8')
+    raise ValueError(f'unknown message format {body[:1]!r}')
@@ -0,0 +1,226 @@
+"""Process metrics in the Prometheus text format
+
+Histograms and counters are sharded per thread: an observation only touches
+the calling thread's own list or dict, so the hot path takes no lock. The
+lock is only taken when a thread records its first value (and folds in the
+shards of threads that have exited) and when /api/metrics merges the shards.
+Gauges are read from a callback at scrape time and cost nothing in between.
+
+The web process serves render() at /api/metrics; Bot.py serves it on
+BOT_METRICS_PORT when that is set.
+"""
+import time
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = {}
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=''):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Base for metrics whose values live in one shard per thread"""
+
+    kind = None
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = self._new_shard()
+        REGISTRY[name] = self
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            pass
+        shard = self._new_shard()
+        with self._lock:
+            # Fold in threads that exited, so per-request threads don't pile up
+            live = []
+            for thread, other in self._shards:
+                if thread.is_alive():
+                    live.append((thread, other))
+                else:
+                    self._merge(self._retired, other)
+            live.append((threading.current_thread(), shard))
+            self._shards = live
+        self._local.shard = shard
+        return shard
+
+    def collect(self):
+        total = self._new_shard()
+        with self._lock:
+            self._merge(total, self._retired)
+            for _, shard in self._shards:
+                self._merge(total, shard)
+        return total
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Sharded):
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        super().__init__(name, help)
+
+    def _new_shard(self):
+        # One count per bucket, then +Inf, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def _merge(self, total, shard):
+        for i, value in enumerate(shard[:]):
+            total[i] += value
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        """with histogram.time(): ... observes the block's duration in seconds"""
+        return _Timer(self)
+
+    def render(self):
+        shard = self.collect()
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), shard):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_sum {format_value(shard[-1])}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+class Counter(_Sharded):
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.labels = labels
+        super().__init__(name, help)
+
+    def _new_shard(self):
+        return {}
+
+    def _merge(self, total, shard):
+        # dict() copies in one step, safe while the owner thread adds keys
+        for key, value in dict(shard).items():
+            total[key] = total.get(key, 0) + value
+
+    def inc(self, *label_values, amount=1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def render(self):
+        return [f'{self.name}{format_labels(self.labels, key)} {format_value(value)}'
+                for key, value in sorted(self.collect().items())]
+
+
+class Gauge:
+    """Current value(s) read from read() at scrape time: a number, or {label values: number}"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, read, labels=()):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labels = labels
+        REGISTRY[name] = self
+
+    def render(self):
+        value = self.read()
+        if not isinstance(value, dict):
+            return [f'{self.name} {format_value(value)}']
+        return [f'{self.name}{format_labels(self.labels, key)} {format_value(count)}'
+                for key, count in sorted(value.items())]
+
+
+def render():
+    lines = []
+    for metric in list(REGISTRY.values()):
+        try:
+            samples = metric.render()
+        except Exception as e:
+            logger.error(f"Error collecting metric {metric.name}: {e}")
+            continue
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+def serve(port):
+    """Serve render() at /metrics from a background thread"""
+    # http.server pulls in email and ssl; only Bot.py with BOT_METRICS_PORT needs it
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"📊 Metrics served on port {port}")
+    return server
+
+
+# Ingest path
+WEBHOOK_ACK_SECONDS = Histogram('signal_webhook_ack_seconds', 'Time to validate and queue one webhook update')
+WEBHOOK_PROCESS_SECONDS = Histogram('signal_webhook_process_seconds', 'Time to process one queued webhook update')
+PARSE_SECONDS = Histogram('signal_parse_seconds', 'Time to parse one candidate message')
+DEDUPE_SECONDS = Histogram('signal_dedupe_seconds', 'Time to check one signal against the dedupe index')
+DB_COMMIT_SECONDS = Histogram('signal_db_commit_seconds', 'Time to write and commit one group-commit batch')
+NOTIFY_SECONDS = Histogram('signal_notify_send_seconds', 'Time for one Bot API sendMessage call')
+
+MESSAGES = Counter('signal_messages_total', 'Channel posts received', ('channel',))
+SIGNALS_SAVED = Counter('signal_saved_total', 'Signals stored', ('channel',))
+SIGNALS_EDITED = Counter('signal_edited_total', 'Stored signals updated from edited posts', ('channel',))
+DUPLICATES = Counter('signal_duplicates_total', 'Signals dropped as duplicates', ('channel',))
+REJECTED = Counter('signal_rejected_total', 'Messages and updates not stored, by reason', ('reason',))
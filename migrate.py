@@ -0,0 +1,227 @@
+"""Online migration of signals.db to the current schema version
+
+    python migrate.py [--db signals.db] [--chunk-size 5000] [--pause-ms 20] [--drop-old]
+    python migrate.py --rebuild-stats
+    python migrate.py --backfill-created-at
+    python migrate.py --normalize-pairs
+
+Schema v1 -> v2 rebuilds the signals table without taking the database
+offline:
+
+1. signals_v2 is created with REAL price columns, created_at and the query
+   indexes already in place.
+2. Rows are copied in id order, chunk_size rows per short write transaction,
+   sleeping between chunks so the live bot and web process can get the write
+   lock. The copy resumes from signals_v2's highest id if interrupted.
+3. Once the copy has caught up, one final transaction copies the last few
+   rows written meanwhile, swaps the tables (signals becomes signals_v1) and
+   bumps PRAGMA user_version.
+
+v1 only stored 'HH:MM', so rows copied from it get created_at = 0: unknown,
+older than any v2 row. API pages are keyed on (created_at, id), so earlier
+migrations that left created_at NULL are fixed up with --backfill-created-at
+(chunked like the copy).
+signals_v1 is kept until --drop-old is passed; dropping a large table holds
+the write lock for a while, so do it off-peak.
+
+--normalize-pairs rewrites pairs stored before symbols.py in their canonical
+spelling (GOLD -> XAUUSD, WOO -> WOOUSDT), chunked like the copy; the stats
+update trigger moves their counts along. Signal hashes are left as they
+are, so a re-post of an old signal within its dedupe window can be saved
+once more.
+
+--rebuild-stats re-derives the stats_counters table from signals and
+security_logs in one transaction; it also holds the write lock for a full
+scan, so run it off-peak too.
+"""
+import time
+import sqlite3
+import logging
+import argparse
+
+import db
+from symbols import load_instruments, normalize_pair
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = ['id', 'channel_name', 'pair', 'direction'] + db.PRICE_COLUMNS + ['timestamp', 'signal_hash', 'message_text']
+
+INSERT_V2_SQL = (f"INSERT INTO signals_v2 (created_at, {', '.join(COPY_COLUMNS)}) "
+                 f"VALUES (0, {', '.join('?' for _ in COPY_COLUMNS)})")
+SELECT_V1_SQL = f"SELECT {', '.join(COPY_COLUMNS)} FROM signals WHERE id > ? ORDER BY id LIMIT ?"
+
+
+def convert_row(row):
+    values = dict(zip(COPY_COLUMNS, row))
+    for column in db.PRICE_COLUMNS:
+        values[column] = db.to_price(values[column])
+    return [values[column] for column in COPY_COLUMNS]
+
+
+def copy_chunk(conn, last_id, chunk_size):
+    """Copy up to chunk_size rows after last_id; return (new last_id, rows copied)"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        rows = conn.execute(SELECT_V1_SQL, (last_id, chunk_size)).fetchall()
+        conn.executemany(INSERT_V2_SQL, [convert_row(row) for row in rows])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return (rows[-1][0] if rows else last_id), len(rows)
+
+
+def migrate_to_v2(conn, chunk_size=5000, pause=0.02):
+    conn.execute(db.SIGNALS_TABLE_SQL.format(table='signals_v2'))
+    for index_sql in db.SIGNALS_INDEXES_SQL:
+        conn.execute(index_sql.format(table='signals_v2'))
+    conn.commit()
+
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM signals_v2").fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM signals WHERE id > ?", (last_id,)).fetchone()[0]
+    logger.info(f"📦 Copying {total} rows into signals_v2 (resuming after id {last_id})")
+
+    copied = 0
+    started = time.monotonic()
+    while True:
+        last_id, count = copy_chunk(conn, last_id, chunk_size)
+        copied += count
+        if count < chunk_size:
+            break
+        rate = copied / max(time.monotonic() - started, 1e-9)
+        logger.info(f"   {copied}/{total} rows ({rate:,.0f} rows/sec)")
+        time.sleep(pause)
+
+    # Catch up on rows the live processes wrote during the copy and swap
+    # the tables in the same transaction, so nothing lands in between.
+    # legacy_alter_table keeps performance.signal_id pointing at "signals".
+    conn.execute('PRAGMA legacy_alter_table = ON')
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        while True:
+            rows = conn.execute(SELECT_V1_SQL, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            conn.executemany(INSERT_V2_SQL, [convert_row(row) for row in rows])
+            last_id = rows[-1][0]
+            copied += len(rows)
+        conn.execute('ALTER TABLE signals RENAME TO signals_v1')
+        conn.execute('ALTER TABLE signals_v2 RENAME TO signals')
+        # Stats triggers moved with the old table; the counts are unchanged.
+        # Without a counters table init_db creates both and rebuilds later.
+        for trigger in db.STATS_TRIGGERS_SQL:
+            if trigger.startswith('signals_'):
+                conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        if db.table_exists(conn, 'stats_counters'):
+            for trigger_sql in db.STATS_TRIGGERS_SQL.values():
+                conn.execute(trigger_sql)
+        conn.execute(f'PRAGMA user_version = {db.SIGNALS_LAYOUT_VERSION}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute('PRAGMA legacy_alter_table = OFF')
+
+    logger.info(f"✅ signals migrated to schema v2 ({copied} rows copied), old table kept as signals_v1")
+
+
+def backfill_created_at(conn, chunk_size=5000, pause=0.02):
+    """Set created_at = 0 on rows a v1 copy left NULL, chunk_size rows per transaction"""
+    updated = 0
+    while True:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            count = conn.execute("""UPDATE signals SET created_at = 0 WHERE id IN
+                                    (SELECT id FROM signals WHERE created_at IS NULL LIMIT ?)""",
+                                 (chunk_size,)).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        updated += count
+        if count < chunk_size:
+            break
+        time.sleep(pause)
+    logger.info(f"✅ created_at backfilled on {updated} rows")
+
+
+def normalize_pairs(conn, chunk_size=5000, pause=0.02):
+    """Rewrite every stored pair that is not in its canonical spelling, chunk_size rows per transaction"""
+    pairs = [row[0] for row in conn.execute("SELECT DISTINCT pair FROM signals WHERE pair IS NOT NULL")]
+    updated = 0
+    for pair in pairs:
+        canonical = normalize_pair(pair)
+        if canonical == pair:
+            continue
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                count = conn.execute("""UPDATE signals SET pair = ? WHERE id IN
+                                        (SELECT id FROM signals WHERE pair = ? LIMIT ?)""",
+                                     (canonical, pair, chunk_size)).rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            updated += count
+            if count < chunk_size:
+                break
+            time.sleep(pause)
+        logger.info(f"   {pair} -> {canonical}")
+    logger.info(f"✅ Pairs normalized on {updated} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate signals.db to the current schema without downtime')
+    parser.add_argument('--db', default=db.DB_PATH, help='database file (default: %(default)s)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='rows copied per transaction')
+    parser.add_argument('--pause-ms', type=float, default=20, help='sleep between chunks to let live writers in')
+    parser.add_argument('--drop-old', action='store_true', help='drop signals_v1 once migrated')
+    parser.add_argument('--rebuild-stats', action='store_true', help='re-derive stats_counters from history')
+    parser.add_argument('--backfill-created-at', action='store_true', help='set created_at on rows copied from v1')
+    parser.add_argument('--normalize-pairs', action='store_true', help='store every pair in its canonical spelling')
+    args = parser.parse_args()
+
+    conn = db.open_connection(args.db)
+    # Transactions are managed explicitly with BEGIN IMMEDIATE
+    conn.isolation_level = None
+
+    try:
+        if not db.table_exists(conn, 'signals'):
+            logger.info("Nothing to migrate: no signals table, init_db creates the current schema")
+        elif db.schema_version(conn) >= db.SIGNALS_LAYOUT_VERSION:
+            logger.info(f"Already on schema v{db.schema_version(conn)}")
+        else:
+            migrate_to_v2(conn, args.chunk_size, args.pause_ms / 1000)
+
+        if args.backfill_created_at:
+            backfill_created_at(conn, args.chunk_size, args.pause_ms / 1000)
+
+        if args.normalize_pairs:
+            load_instruments()
+            normalize_pairs(conn, args.chunk_size, args.pause_ms / 1000)
+
+        if args.drop_old and db.table_exists(conn, 'signals_v1'):
+            logger.info("🗑️ Dropping signals_v1")
+            conn.execute('DROP TABLE signals_v1')
+
+        if args.rebuild_stats:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                db.rebuild_stats_counters(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info("✅ Stats counters rebuilt")
+    except sqlite3.OperationalError as e:
+        logger.error(f"❌ Migration failed, safe to re-run: {e}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Alert delivery driven by signal events instead of polling
+
+The notifier subscribes to SIGNAL_SAVED on the event bus and delivers every
+signal in id order as soon as it is committed. Its position is persisted in
+event_cursors, so a restart resumes where it stopped instead of dropping or
+repeating alerts.
+
+Signals written by the other process (the Bot.py worker) never reach this
+process's bus; they are picked up by an id-range read whenever an event
+reveals a gap, and at most CATCHUP_INTERVAL seconds after they land.
+"""
+import os
+import queue
+import logging
+import threading
+
+from events import bus, SIGNAL_SAVED
+from db import get_signals_after, get_max_signal_id, load_cursor, save_cursor, is_live_signal
+
+logger = logging.getLogger(__name__)
+
+CATCHUP_INTERVAL = float(os.getenv('NOTIFIER_CATCHUP_SECONDS', '30'))
+CATCHUP_BATCH = 100
+
+_STOP = object()
+
+
+class SignalNotifier:
+    """Calls send(signal_row) once per saved signal, in id order"""
+
+    def __init__(self, send, consumer='telegram_notifier', catchup_interval=CATCHUP_INTERVAL):
+        self.send = send
+        self.consumer = consumer
+        self.catchup_interval = catchup_interval
+        self.last_id = None
+        self._events = None
+        self._thread = None
+
+    def start(self):
+        # Subscribe before reading the cursor so nothing falls in between
+        self._events = bus.subscribe(SIGNAL_SAVED)
+        self.last_id = load_cursor(self.consumer)
+        if self.last_id is None:
+            # First run: start from now rather than alerting on all history
+            self.last_id = get_max_signal_id()
+            save_cursor(self.consumer, self.last_id)
+        self._thread = threading.Thread(target=self._run, name=self.consumer, daemon=True)
+        self._thread.start()
+        logger.info(f"📊 {self.consumer} started after signal id {self.last_id}")
+
+    def stop(self, timeout=5):
+        if self._thread is None:
+            return
+        self._events.put((None, _STOP))
+        self._thread.join(timeout)
+        bus.unsubscribe(self._events)
+
+    def backlog(self):
+        return self._events.qsize() if self._events is not None else 0
+
+    def _run(self):
+        self._catch_up()
+        while True:
+            try:
+                _, event = self._events.get(timeout=self.catchup_interval)
+            except queue.Empty:
+                self._catch_up()
+                continue
+            if event is _STOP:
+                return
+
+            try:
+                if event['id'] <= self.last_id:
+                    continue
+                if event['id'] > self.last_id + 1:
+                    # Rows from the other process, or events this process missed
+                    self._catch_up()
+                if event['id'] > self.last_id:
+                    self._deliver(event)
+            except Exception as e:
+                logger.error(f"Error in notifier: {e}")
+
+    def _catch_up(self):
+        try:
+            while True:
+                rows = get_signals_after(self.last_id, CATCHUP_BATCH)
+                for row in rows:
+                    self._deliver(row)
+                if len(rows) < CATCHUP_BATCH:
+                    return
+        except Exception as e:
+            logger.error(f"Error catching up notifications: {e}")
+
+    def _deliver(self, signal):
+        try:
+            # History loaded by backfill.py is not news
+            if is_live_signal(signal):
+                self.send(signal)
+        except Exception as e:
+            logger.error(f"❌ Failed to send notification: {e}")
+        self.last_id = signal['id']
+        save_cursor(self.consumer, self.last_id)
@@ -0,0 +1,332 @@
+"""Outcome tracking: checks open signals against a price stream
+
+    python outcomes.py --replay ticks.csv [more.csv ...] [--db signals.db] [--max-age-hours 168]
+    python outcomes.py --feed mypackage.feeds:binance_ticks [--db signals.db]
+
+Every TP1..TP6 and SL level of a recent signal waits in a per-pair LevelBook
+until the price reaches it. Each hit is written to the performance table as
+it happens (tp_hit 'TP1'.. or sl_hit 1, with pips from the entry) and the
+signal is closed once its stop or its last target is hit, or after
+--max-age-hours without either.
+
+A book keeps the levels hit by a rising price (BUY targets, SELL stops) and
+those hit by a falling price (SELL targets, BUY stops) in two sorted lists,
+so a tick bisects to the levels it crossed and pops them, however many
+signals are open. Levels of signals that closed some other way are left in
+place and skipped when reached, until they make up half a book and it is
+compacted.
+
+Replay files are CSV with a header, either time,pair,price (ticks) or
+time,pair,open,high,low,close (bars); time is epoch seconds or ISO 8601 UTC.
+When one bar reaches both a stop and a target of a signal, the stop counts
+first. --feed names a function returning any iterable of the same
+(time, pair, high, low) tuples, for a live source. Signals saved while the
+tracker runs are picked up every REFRESH_SECONDS.
+"""
+import os
+import csv
+import time
+import heapq
+import logging
+import argparse
+import importlib
+import itertools
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+import db
+from symbols import load_instruments, normalize_pair
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OUTCOME_MAX_AGE = float(os.getenv('OUTCOME_MAX_AGE_HOURS', '168')) * 3600
+REFRESH_SECONDS = 10
+REFRESH_BATCH = 1000
+BULK_INSERT = 32
+TARGETS = ['tp1', 'tp2', 'tp3', 'tp4', 'tp5', 'tp6']
+
+# Price change of one pip; other pairs use pip_size()'s rules
+PIP_SIZES = {'XAUUSD': 0.1, 'XAGUSD': 0.01, 'US30': 1.0, 'NAS100': 1.0}
+
+
+def pair_key(pair):
+    """Canonical symbol, so a feed's "XAU/USD" reaches signals stored as XAUUSD (or GOLD before symbols.py)"""
+    return normalize_pair(pair) or ''
+
+
+def pip_size(pair, price):
+    """JPY pairs 0.01, other pairs quoted below 50 0.0001, anything pricier (crypto, indices) 1.0"""
+    if pair in PIP_SIZES:
+        return PIP_SIZES[pair]
+    if 'JPY' in pair:
+        return 0.01
+    return 0.0001 if price < 50 else 1.0
+
+
+class OpenSignal:
+    __slots__ = ('id', 'pair', 'direction', 'entry', 'pip', 'created_at', 'targets_left', 'has_stop', 'levels',
+                 'closed')
+
+    def __init__(self, row, targets_left, has_stop):
+        self.id = row['id']
+        self.pair = pair_key(row['pair'])
+        self.direction = row['direction']
+        self.entry = row['entry']
+        self.pip = pip_size(self.pair, self.entry)
+        self.created_at = row['created_at'] or 0
+        self.targets_left = targets_left
+        self.has_stop = has_stop
+        # Levels of this signal still in its LevelBook
+        self.levels = targets_left + has_stop
+        self.closed = False
+
+    def pips(self, level):
+        return round((level - self.entry) / self.pip * (1 if self.direction == 'BUY' else -1), 1)
+
+
+class LevelBook:
+    """Open levels of one pair: rising (hit when price >= level) and falling (hit when price <= level)"""
+
+    def __init__(self):
+        # (level, seq, signal, label), sorted; seq breaks ties between equal levels
+        self.rising = []
+        self.falling = []
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.rising) + len(self.falling)
+
+    def add(self, entries, rising):
+        levels = self.rising if rising else self.falling
+        if len(entries) > BULK_INSERT:
+            # One sort of the merged runs beats thousands of list inserts
+            levels.extend(entries)
+            levels.sort()
+        else:
+            for entry in entries:
+                levels.insert(bisect_right(levels, entry), entry)
+
+    def pop_reached(self, high, low):
+        """Remove and return every level the price range [low, high] reached"""
+        i = bisect_right(self.rising, (high, float('inf')))
+        reached = self.rising[:i]
+        del self.rising[:i]
+        j = bisect_left(self.falling, (low, float('-inf')))
+        reached += self.falling[j:]
+        del self.falling[j:]
+        return reached
+
+    def compact(self):
+        self.rising = [entry for entry in self.rising if not entry[2].closed]
+        self.falling = [entry for entry in self.falling if not entry[2].closed]
+        self.stale = 0
+
+
+class OutcomeTracker:
+    """Feeds prices through per-pair LevelBooks and records each hit with record()"""
+
+    def __init__(self, max_age=OUTCOME_MAX_AGE, record=db.record_outcome):
+        self.max_age = max_age
+        self.record = record
+        self.books = {}
+        # Feed spelling -> pair_key(), as a feed repeats the same few names
+        self._pair_keys = {}
+        self.last_id = 0
+        # Signals wait in pending until the price stream reaches their
+        # created_at, then sit in active (oldest first) until they expire
+        self._pending = []
+        self._active = []
+        self._seq = itertools.count()
+        self.counters = {'tracked': 0, 'targets': 0, 'stops': 0, 'closed': 0, 'expired': 0, 'ticks': 0}
+
+    def open_signals(self):
+        return sum(1 for *_, signal in self._active if not signal.closed)
+
+    def load(self, since):
+        """Track the signals created since then, minus levels the performance table already has"""
+        # refresh() starts after the newest signal, even if none of them is recent
+        self.last_id = db.get_max_signal_id()
+        rows = db.get_signals_since(since)
+        hits = db.get_outcomes(row['id'] for row in rows)
+        for row in rows:
+            self.add(row, hits.get(row['id'], ()))
+        logger.info(f"🎯 Tracking {self.counters['tracked']} signals created since "
+                    f"{datetime.fromtimestamp(since, timezone.utc):%Y-%m-%d %H:%M}")
+
+    def refresh(self):
+        """Pick up signals saved since the last load or refresh"""
+        while True:
+            rows = db.get_outcome_signals_after(self.last_id, REFRESH_BATCH)
+            for row in rows:
+                self.add(row)
+            if len(rows) < REFRESH_BATCH:
+                return
+
+    def add(self, row, hits=()):
+        """Queue one signal row; levels on the wrong side of the entry are ignored"""
+        self.last_id = max(self.last_id, row['id'])
+        entry, direction = row['entry'], row['direction']
+        if entry is None or direction not in ('BUY', 'SELL') or 'SL' in hits:
+            return
+        buy = direction == 'BUY'
+        targets = [(f'TP{n}', row[column]) for n, column in enumerate(TARGETS, 1)
+                   if row[column] is not None and (row[column] > entry if buy else row[column] < entry)]
+        stop = row['sl'] if row['sl'] is not None and (row['sl'] < entry if buy else row['sl'] > entry) else None
+        if targets and all(label in hits for label, _ in targets):
+            return
+        targets = [(label, level) for label, level in targets if label not in hits]
+        if not targets and stop is None:
+            return
+
+        signal = OpenSignal(row, len(targets), stop is not None)
+        heapq.heappush(self._pending, (signal.created_at, signal.id, signal, targets, stop))
+        self.counters['tracked'] += 1
+
+    def on_price(self, at, pair, high, low=None):
+        """Apply one tick (low omitted) or bar at epoch time at"""
+        low = high if low is None else low
+        self.counters['ticks'] += 1
+        if self._pending and self._pending[0][0] <= at:
+            self._activate(at)
+        if self._active and self._active[0][0] < at - self.max_age:
+            self._expire(at)
+
+        key = self._pair_keys.get(pair)
+        if key is None:
+            key = self._pair_keys[pair] = pair_key(pair)
+        book = self.books.get(key)
+        if not book:
+            return
+        reached = book.pop_reached(high, low)
+        if not reached:
+            return
+        for _, _, signal, _ in reached:
+            signal.levels -= 1
+            if signal.closed:
+                # A stale level has left the book
+                book.stale -= 1
+        # Stops before targets within one bar, then targets in TP order
+        reached.sort(key=lambda entry: (entry[3] != 'SL', entry[2].id, entry[3]))
+        update_time = datetime.fromtimestamp(at, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        for level, _, signal, label in reached:
+            if signal.closed:
+                continue
+            if label == 'SL':
+                self.record(signal.id, None, 1, signal.pips(level), update_time)
+                self.counters['stops'] += 1
+                self.counters['closed'] += 1
+                signal.has_stop = False
+                self._close(book, signal)
+            else:
+                self.record(signal.id, label, 0, signal.pips(level), update_time)
+                self.counters['targets'] += 1
+                signal.targets_left -= 1
+                if not signal.targets_left:
+                    self.counters['closed'] += 1
+                    self._close(book, signal)
+        if book.stale * 2 > len(book):
+            book.compact()
+
+    def run(self, feed, refresh_seconds=REFRESH_SECONDS):
+        """Consume (time, pair, high, low) tuples, refreshing open signals from the database as it goes"""
+        next_refresh = time.monotonic() + refresh_seconds
+        for at, pair, high, low in feed:
+            self.on_price(at, pair, high, low)
+            if time.monotonic() >= next_refresh:
+                self.refresh()
+                next_refresh = time.monotonic() + refresh_seconds
+
+    def _activate(self, at):
+        added = {}
+        while self._pending and self._pending[0][0] <= at:
+            created_at, signal_id, signal, targets, stop = heapq.heappop(self._pending)
+            if created_at < at - self.max_age:
+                continue
+            rising, falling = added.setdefault(signal.pair, ([], []))
+            buy = signal.direction == 'BUY'
+            for label, level in targets:
+                (rising if buy else falling).append((level, next(self._seq), signal, label))
+            if stop is not None:
+                (falling if buy else rising).append((stop, next(self._seq), signal, 'SL'))
+            heapq.heappush(self._active, (created_at, signal_id, signal))
+
+        for pair, (rising, falling) in added.items():
+            book = self.books.get(pair)
+            if book is None:
+                book = self.books[pair] = LevelBook()
+            book.add(rising, rising=True)
+            book.add(falling, rising=False)
+
+    def _expire(self, at):
+        while self._active and self._active[0][0] < at - self.max_age:
+            _, _, signal = heapq.heappop(self._active)
+            if not signal.closed:
+                self._close(self.books[signal.pair], signal)
+                self.counters['expired'] += 1
+
+    def _close(self, book, signal):
+        signal.closed = True
+        # Its levels still in the book are skipped from now on; the ones
+        # reached in the bar that closed it are out already
+        book.stale += signal.levels
+
+
+def parse_time(value):
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+
+def iter_replay(paths):
+    """(time, pair, high, low) from tick or OHLC CSV files, in file order"""
+    for path in paths:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if 'price' in row:
+                    price = float(row['price'])
+                    yield parse_time(row['time']), row['pair'], price, price
+                else:
+                    yield parse_time(row['time']), row['pair'], float(row['high']), float(row['low'])
+
+
+def load_feed(spec):
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record TP/SL hits of stored signals from a price stream')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--replay', nargs='+', metavar='CSV', help='tick or OHLC files to replay')
+    source.add_argument('--feed', metavar='MODULE:FUNCTION', help='function returning (time, pair, high, low) tuples')
+    parser.add_argument('--db', default=db.DB_PATH, help='database file (default: %(default)s)')
+    parser.add_argument('--max-age-hours', type=float, default=OUTCOME_MAX_AGE / 3600,
+                        help='stop tracking signals this old (default: %(default)s)')
+    args = parser.parse_args()
+
+    db.DB_PATH = args.db
+    db.init_db()
+    load_instruments()
+    tracker = OutcomeTracker(max_age=args.max_age_hours * 3600)
+
+    feed = iter_replay(args.replay) if args.replay else iter(load_feed(args.feed))
+    first = next(feed, None)
+    if first is None:
+        logger.info("Empty price stream, nothing to do")
+        return
+    tracker.load(first[0] - tracker.max_age)
+    tracker.run(itertools.chain([first], feed))
+
+    counters = tracker.counters
+    logger.info(f"✅ {counters['ticks']} prices: {counters['targets']} targets and {counters['stops']} stops hit, "
+                f"{counters['closed']} signals closed, {counters['expired']} expired, "
+                f"{tracker.open_signals()} still open")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+r"""Cheap signal/commentary prefilter run before parse_signal
+
+The message is upper-cased once and every configured keyword is checked in a
+single scan of one compiled alternation, instead of one substring scan per
+keyword. Posts that carry no digits, or short posts that read like
+commentary ("TP hit!", "good morning") and have neither a direction with a
+price nor a priced entry, are rejected before they reach the full parser. A
+setup that ends with a management note ("move SL to breakeven after TP1")
+still gets through.
+
+Channels can override the defaults with a JSON file (CHANNEL_FILTERS_FILE,
+default channel_filters.json) loaded once at startup:
+
+    {
+        "default": {"keywords": ["BUY", "SELL"], "chatter": ["TP\\s*\\d?\\s*HIT"]},
+        "channels": {
+            "Crypto Whales": {"keywords": ["LONG", "SHORT", "USDT"]},
+            "Gold Signals VIP": {"chatter": []}
+        }
+    }
+
+Chatter entries are regular expressions matched against the upper-cased
+text; any key left out inherits the default.
+"""
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_FILTERS_FILE = os.getenv('CHANNEL_FILTERS_FILE', 'channel_filters.json')
+
+SIGNAL_KEYWORDS = ['BUY', 'SELL', 'LONG', 'SHORT', 'TP', 'SL', 'ENTRY', 'XAUUSD', 'GOLD', 'BTC']
+
+# Result updates and small talk that mention signal keywords but never carry
+# a setup. Branches start with a literal so the regex engine can skip ahead.
+CHATTER_PATTERNS = [
+    r'(?:TP|TARGET|SL|STOP ?LOSS)\s*\d?\s*(?:HIT|REACHED|DONE|SMASHED)',
+    r'HIT\s+(?:TP|SL|TARGET)',
+    r'GOOD\s+(?:MORNING|AFTERNOON|EVENING|NIGHT)',
+    r'MOVE\s+(?:SL|STOP ?LOSS)\s+TO\b',
+    r'CLOSE\s+ALL\b',
+    r'BREAK\s?EVEN\b',
+    r'IN\s+PROFIT\b',
+]
+
+# Setups run long; only posts shorter than this are checked for chatter
+MAX_CHATTER_LENGTH = 200
+
+# A direction with a price right after it ("BUY 2345", "LONG ENTRY 64000") or a
+# priced entry level ("ENTRY ZONE: 64000", "@ 2345"): a post that has one is a
+# setup, whatever chatter it also contains
+SETUP_PATTERN = re.compile(
+    r'\b(?:BUY|SELL|LONG|SHORT)\b\D{0,12}\d'
+    r'|ENTRY(?: PRICE| ZONE)?[:\s@-]*\d|ENTER[:\s@]*\d|@ ?\d'
+)
+
+_DIGIT = re.compile(r'\d')
+
+
+class KeywordFilter:
+    """Decides in a few C-level scans whether a message is worth parsing"""
+
+    def __init__(self, keywords=None, chatter=None, require_digit=True):
+        keywords = SIGNAL_KEYWORDS if keywords is None else keywords
+        chatter = CHATTER_PATTERNS if chatter is None else chatter
+        self.keywords = re.compile('|'.join(re.escape(k.upper()) for k in keywords)) if keywords else None
+        self.chatter = re.compile('|'.join(f'(?:{c})' for c in chatter)) if chatter else None
+        self.require_digit = require_digit
+
+    def accepts(self, text):
+        """True if text should go on to parse_signal"""
+        if not text or self.keywords is None:
+            return False
+        text = text.upper()
+        if self.keywords.search(text) is None:
+            return False
+        if self.require_digit and _DIGIT.search(text) is None:
+            return False
+        if (self.chatter is not None and len(text) < MAX_CHATTER_LENGTH and self.chatter.search(text)
+                and SETUP_PATTERN.search(text) is None):
+            return False
+        return True
+
+
+_default_filter = KeywordFilter()
+_channel_filters = {}
+
+
+def load_channel_filters(path=CHANNEL_FILTERS_FILE):
+    """Build the default and per-channel filters; call once at startup"""
+    global _default_filter, _channel_filters
+
+    if not os.path.exists(path):
+        _default_filter = KeywordFilter()
+        _channel_filters = {}
+        return
+
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    default = config.get('default', {})
+    _default_filter = KeywordFilter(
+        default.get('keywords'), default.get('chatter'), default.get('require_digit', True)
+    )
+
+    filters = {}
+    for channel_name, overrides in config.get('channels', {}).items():
+        merged = dict(default, **overrides)
+        filters[channel_name] = KeywordFilter(
+            merged.get('keywords'), merged.get('chatter'), merged.get('require_digit', True)
+        )
+    _channel_filters = filters
+    logger.info(f"✅ Loaded keyword filters for {len(filters)} channels from {path}")
+
+
+def get_filter(channel_name):
+    return _channel_filters.get(channel_name, _default_filter)
+
+
+def is_candidate_signal(text, channel_name):
+    """Cheap check run before the full parser"""
+    return get_filter(channel_name).accepts(text)
@@ -0,0 +1,186 @@
+"""On-demand sampling profiler for the live processes
+
+Stacks of every thread are sampled from sys._current_frames() every
+PROFILE_INTERVAL_MS and written as collapsed stacks, one "frame;frame;... count"
+line per distinct stack, ready for flamegraph.pl or speedscope. Samples are
+wall-clock, so threads waiting on SQLite locks or Telegram show up as much as
+ones burning CPU in the parser.
+
+Ways to take a profile, all off unless asked for:
+
+- kill -USR1 <pid> on server.py or Bot.py samples for PROFILE_SECONDS
+- POST /api/profile?seconds=N on server.py, with "Authorization: Bearer
+  $PROFILE_TOKEN" (the endpoint does not exist without PROFILE_TOKEN)
+- PROFILE_WEBHOOK_FRACTION=0.01 samples the worker thread of 1% of webhook
+  updates while they are processed, accumulating into webhook-<pid>.collapsed
+
+Files go to PROFILE_DIR. Nothing samples until one of these is used; an
+unsampled webhook update costs one random() comparison.
+"""
+import os
+import sys
+import time
+import atexit
+import random
+import signal
+import logging
+import threading
+from collections import Counter
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SECONDS = float(os.getenv('PROFILE_SECONDS', '30'))
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+SAMPLE_INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+WEBHOOK_FRACTION = float(os.getenv('PROFILE_WEBHOOK_FRACTION', '0'))
+REQUEST_FLUSH_EVERY = 100
+MAX_PROFILE_SECONDS = 120
+
+_busy = threading.Lock()
+_NOT_SAMPLED = nullcontext()
+
+
+def frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame, root):
+    """'root;outermost;...;innermost' for frame's stack"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(root)
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def write_collapsed(stacks, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f'{stack} {count}\n')
+
+
+def sample(seconds, interval=SAMPLE_INTERVAL):
+    """Sample every other thread's stack for seconds; return {collapsed stack: samples}"""
+    me = threading.get_ident()
+    names = {}
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if ident not in names:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks[collapse(frame, names.get(ident, str(ident)))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def profile_to_file(seconds, name):
+    """Sample for seconds into PROFILE_DIR; return the file, or None if a profile is already running"""
+    if not _busy.acquire(blocking=False):
+        return None
+    try:
+        seconds = min(seconds, MAX_PROFILE_SECONDS)
+        logger.info(f"🔬 Sampling stacks for {seconds:g}s")
+        stacks = sample(seconds)
+        path = os.path.join(PROFILE_DIR, f"{name}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+        write_collapsed(stacks, path)
+        logger.info(f"🔬 Profile written to {path} ({sum(stacks.values())} samples)")
+        return path
+    finally:
+        _busy.release()
+
+
+def install_signal_handler(name, signum=getattr(signal, 'SIGUSR1', None)):
+    """Profile for PROFILE_SECONDS whenever the process gets signum; call from the main thread"""
+    if signum is None:
+        return
+
+    def handle(signum, frame):
+        threading.Thread(target=profile_to_file, args=(PROFILE_SECONDS, name), name='profiler', daemon=True).start()
+
+    signal.signal(signum, handle)
+
+
+class RequestProfiler:
+    """Samples only the threads that are inside a sampled request"""
+
+    def __init__(self, name, fraction, interval=SAMPLE_INTERVAL):
+        self.name = name
+        self.fraction = fraction
+        self.interval = interval
+        self.path = os.path.join(PROFILE_DIR, f'{name}-{os.getpid()}.collapsed')
+        self._active = set()
+        self._stacks = Counter()
+        self._requests = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        if fraction:
+            atexit.register(self.flush)
+
+    def __call__(self):
+        """Context manager around one request; only a fraction of them are sampled"""
+        if not self.fraction or random.random() >= self.fraction:
+            return _NOT_SAMPLED
+        return _SampledRequest(self)
+
+    def flush(self):
+        with self._lock:
+            stacks = Counter(self._stacks)
+        if stacks:
+            write_collapsed(stacks, self.path)
+
+    def _enter(self):
+        with self._lock:
+            self._active.add(threading.get_ident())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'{self.name}-profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _exit(self):
+        with self._lock:
+            self._active.discard(threading.get_ident())
+            self._requests += 1
+            flush = self._requests % REQUEST_FLUSH_EVERY == 0
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while True:
+            # Clear before checking, so an _enter in between still wakes us
+            self._wake.clear()
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            stacks = [collapse(frames[ident], self.name) for ident in active if ident in frames]
+            with self._lock:
+                for stack in stacks:
+                    self._stacks[stack] += 1
+            time.sleep(self.interval)
+
+
+class _SampledRequest:
+    __slots__ = ('profiler',)
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.profiler._enter()
+
+    def __exit__(self, *exc_info):
+        self.profiler._exit()
+
+
+webhook_profiler = RequestProfiler('webhook', WEBHOOK_FRACTION)
@@ -0,0 +1,204 @@
+"""Long-lived, rate-limited sender for outgoing Telegram messages
+
+One event loop on a background thread owns a keep-alive httpx client, so
+every message reuses pooled connections instead of opening a new session
+(or a new event loop) per alert. Callers on any thread get a Future back.
+
+Sends follow Telegram's limits with token buckets: GLOBAL_RATE messages per
+second overall, one per second to a private chat and 20 per minute to a group
+or channel. Messages to one chat go out in the order they were queued. A 429
+is retried after the retry_after Telegram asks for; 5xx and network errors
+back off exponentially, up to MAX_RETRIES times.
+
+With TELEGRAM_DIGEST_SECONDS set, alerts passed to notify() within that
+window of the first one are coalesced into a single digest message per chat.
+
+TELEGRAM_API_URL points the sender at another Bot API server, e.g. the local
+stand-in in benchmarks/fake_bot_api.py.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+CHAT_RATE = 1.0
+GROUP_RATE = 20 / 60
+DIGEST_WINDOW = float(os.getenv('TELEGRAM_DIGEST_SECONDS', '0'))
+MAX_RETRIES = 5
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = '\n' + '─' * 20 + '\n'
+
+
+class TokenBucket:
+    """rate tokens per second, bursting up to capacity; only used from one event loop"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self):
+        """Take a token, going into debt if needed; return how long to wait before using it"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def is_group(chat_id):
+    """Groups and channels have negative ids (or an @username)"""
+    return str(chat_id).startswith(('-', '@'))
+
+
+def digest_messages(texts):
+    """Coalesce alerts into as few messages as fit Telegram's length limit"""
+    if len(texts) == 1:
+        return texts
+    header = f"📦 {len(texts)} new signals\n"
+    messages, current = [], header
+    for text in texts:
+        text = text.strip()
+        if len(current) + len(DIGEST_SEPARATOR) + len(text) > MAX_MESSAGE_LENGTH and current != header:
+            messages.append(current)
+            current = header
+        current += DIGEST_SEPARATOR + text
+    messages.append(current)
+    return messages
+
+
+class TelegramSender:
+    """Pooled, rate-limited Bot API client running on its own event loop"""
+
+    def __init__(self, token, api_url=TELEGRAM_API_URL, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 group_rate=GROUP_RATE, digest_window=DIGEST_WINDOW):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/"
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.digest_window = digest_window
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        self._chats = {}
+        self._digests = {}
+        self._client = None
+        self.counters = {'sent': 0, 'failed': 0, 'retries': 0, 'digests': 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='telegram-sender', daemon=True)
+        self._thread.start()
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        """Queue a message; the Future resolves to True once Telegram accepted it"""
+        return asyncio.run_coroutine_threadsafe(self._send(chat_id, text, parse_mode), self._loop)
+
+    def notify(self, chat_id, text):
+        """Send an alert, folded into a digest when digest_window is set"""
+        if not self.digest_window:
+            self.send_message(chat_id, text)
+        else:
+            self._loop.call_soon_threadsafe(self._add_to_digest, chat_id, text)
+
+    def close(self, timeout=10):
+        """Flush pending digests and wait for queued messages, then stop the loop"""
+        if not self._thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(timeout), self._loop).result(timeout + 1)
+        except Exception as e:
+            logger.error(f"Error closing Telegram sender: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    def _add_to_digest(self, chat_id, text):
+        pending = self._digests.get(chat_id)
+        if pending is None:
+            self._digests[chat_id] = [text]
+            self._loop.call_later(self.digest_window, self._flush_digest, chat_id)
+        else:
+            pending.append(text)
+
+    def _flush_digest(self, chat_id):
+        texts = self._digests.pop(chat_id, None)
+        if not texts:
+            return
+        if len(texts) > 1:
+            self.counters['digests'] += 1
+        for message in digest_messages(texts):
+            self._loop.create_task(self._send(chat_id, message))
+
+    def _chat(self, chat_id):
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = (TokenBucket(self.group_rate if is_group(chat_id) else self.chat_rate),
+                                           asyncio.Lock())
+        return chat
+
+    def _http(self):
+        if self._client is None:
+            # httpx is slow to import; load it with the first message, not at startup
+            import httpx
+            self._client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_keepalive_connections=10))
+        return self._client
+
+    async def _send(self, chat_id, text, parse_mode=None):
+        import httpx
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        bucket, lock = self._chat(chat_id)
+
+        # Holding the chat's lock through retries keeps its messages in order
+        async with lock:
+            for attempt in range(MAX_RETRIES + 1):
+                await bucket.acquire()
+                await self._global.acquire()
+                try:
+                    with metrics.NOTIFY_SECONDS.time():
+                        response = await self._http().post(self.url + 'sendMessage', json=payload)
+                except httpx.HTTPError as e:
+                    reason, delay = str(e) or type(e).__name__, min(2 ** attempt, 30)
+                else:
+                    if response.status_code == 200:
+                        self.counters['sent'] += 1
+                        return True
+                    if response.status_code == 429:
+                        try:
+                            delay = response.json()['parameters']['retry_after']
+                        except (ValueError, KeyError, TypeError):
+                            delay = 2 ** attempt
+                        reason = 'rate limited'
+                    elif response.status_code >= 500:
+                        reason, delay = f'HTTP {response.status_code}', min(2 ** attempt, 30)
+                    else:
+                        logger.error(f"❌ Telegram rejected message to {chat_id}: {response.text}")
+                        self.counters['failed'] += 1
+                        return False
+
+                if attempt < MAX_RETRIES:
+                    self.counters['retries'] += 1
+                    logger.warning(f"⚠️ Sending to {chat_id} failed ({reason}), retrying in {delay}s")
+                    await asyncio.sleep(delay)
+
+        logger.error(f"❌ Giving up on message to {chat_id} after {MAX_RETRIES} retries")
+        self.counters['failed'] += 1
+        return False
+
+    async def _close(self, timeout):
+        for chat_id in list(self._digests):
+            self._flush_digest(chat_id)
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        if self._client is not None:
+            await self._client.aclose()
@@ -1,13 +1,14 @@
 import os
+import sys
+import hmac
+import atexit
 import json
-import sqlite3
-from datetime import datetime
-from flask import Flask, jsonify, request
+import signal as os_signal
+from datetime import datetime, timezone
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from telegram import Bot, Update
-import asyncio
-import threading
-import time
+from werkzeug.http import http_date, quote_etag
+import queue
 import logging
 
 # Setup logging
@@ -19,249 +20,24 @@ CORS(app)
 
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 USER_ID = os.getenv('TELEGRAM_USER_ID')
-bot = Bot(token=BOT_TOKEN) if BOT_TOKEN else None
 
-last_notified_signal_id = 0
-
-# Import signal parsing functions
-import re
-import hashlib
-
-def init_db():
-    """Initialize the database with all required tables"""
-    conn = sqlite3.connect('signals.db')
-    c = conn.cursor()
-    
-    # Signals table
-    c.execute('''CREATE TABLE IF NOT EXISTS signals
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  channel_name TEXT,
-                  pair TEXT,
-                  direction TEXT,
-                  entry TEXT,
-                  tp1 TEXT, tp2 TEXT, tp3 TEXT, tp4 TEXT, tp5 TEXT, tp6 TEXT,
-                  sl TEXT,
-                  leverage TEXT,
-                  timestamp TEXT,
-                  signal_hash TEXT UNIQUE,
-                  message_text TEXT)''')
-    
-    # Security logs table
-    c.execute('''CREATE TABLE IF NOT EXISTS security_logs
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  event_type TEXT,
-                  description TEXT,
-                  timestamp TEXT,
-                  severity TEXT)''')
-    
-    # Performance tracking
-    c.execute('''CREATE TABLE IF NOT EXISTS performance
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  signal_id INTEGER,
-                  tp_hit TEXT,
-                  sl_hit BOOLEAN,
-                  pips_gained REAL,
-                  update_time TEXT,
-                  FOREIGN KEY(signal_id) REFERENCES signals(id))''')
-    
-    conn.commit()
-    conn.close()
-    logger.info("✅ Database initialized successfully")
-
-def parse_signal(text, channel_name):
-    """Parse trading signal from message text"""
-    text = text.upper()
-    signal = {
-        'channel': channel_name,
-        'pair': None,
-        'direction': None,
-        'entry': None,
-        'tp1': None, 'tp2': None, 'tp3': None, 'tp4': None, 'tp5': None, 'tp6': None,
-        'sl': None,
-        'leverage': None,
-        'timestamp': datetime.now().strftime('%H:%M'),
-        'date': datetime.now().strftime('%d %B %Y').upper(),
-        'raw_text': text
-    }
-    
-    # Extract trading pair
-    pairs = re.findall(r'(XAU[A-Z]+|BTC[A-Z]+|ETH[A-Z]+|EUR[A-Z]+|GBP[A-Z]+|USD[A-Z]+|AUD[A-Z]+|CAD[A-Z]+|JPY[A-Z]+|[A-Z]{3,}USD[A-Z]?|GOLD|US30|CYBER|WOO|STORJ|GAS|SUSHI|ID|ICP)', text)
-    if pairs:
-        signal['pair'] = pairs[0]
-    
-    # Extract direction
-    if 'BUY' in text or 'LONG' in text:
-        signal['direction'] = 'BUY'
-    elif 'SELL' in text or 'SHORT' in text:
-        signal['direction'] = 'SELL'
-    
-    # Extract entry
-    entry_patterns = [
-        r'ENTRY[:\s@-]*([0-9.]+)',
-        r'ENTER[:\s@]*([0-9.]+)',
-        r'ENTRY PRICE[:\s]*([0-9.]+)',
-        r'ENTRY ZONE[:\s]*([0-9.-]+)',
-        r'BUY[:\s@]*([0-9.]+)',
-        r'SELL[:\s@]*([0-9.]+)',
-        r'@ ?([0-9.]+)',
-    ]
-    for pattern in entry_patterns:
-        match = re.search(pattern, text)
-        if match:
-            signal['entry'] = match.group(1)
-            break
-    
-    # Extract TPs
-    tp_patterns = [
-        r'TP[:\s]*?([1-6])[:\s-]*([0-9.]+)',
-        r'TAKE PROFIT[:\s]*?([1-6])[:\s-]*([0-9.]+)',
-        r'TARGET[:\s]*?([1-6])[:\s-]*([0-9.]+)',
-    ]
-    
-    for pattern in tp_patterns:
-        matches = re.findall(pattern, text)
-        for match in matches:
-            tp_num = int(match[0])
-            if 1 <= tp_num <= 6:
-                signal[f'tp{tp_num}'] = match[1]
-    
-    # Extract Stop Loss
-    sl_patterns = [
-        r'SL[:\s@-]*([0-9.]+)',
-        r'STOP LOSS[:\s@-]*([0-9.]+)',
-        r'STOPLOSS[:\s@]*([0-9.]+)',
-    ]
-    for pattern in sl_patterns:
-        match = re.search(pattern, text)
-        if match:
-            signal['sl'] = match.group(1)
-            break
-    
-    # Extract Leverage
-    leverage_patterns = [
-        r'LEVERAGE[:\s]*X?([0-9.]+)',
-        r'CROSS[:\s]*X?([0-9.]+)',
-        r'X([0-9.]+)',
-    ]
-    for pattern in leverage_patterns:
-        match = re.search(pattern, text)
-        if match:
-            signal['leverage'] = match.group(1)
-            break
-    
-    return signal
-
-def generate_signal_hash(pair, entry):
-    """Generate hash for duplicate detection"""
-    hash_string = f"{pair}_{entry}"
-    return hashlib.md5(hash_string.encode()).hexdigest()
-
-def is_duplicate_signal(pair, entry):
-    """Check if signal already exists"""
-    if not pair or not entry:
-        return False
-    
-    signal_hash = generate_signal_hash(pair, entry)
-    conn = sqlite3.connect('signals.db')
-    c = conn.cursor()
-    c.execute("SELECT id FROM signals WHERE signal_hash = ?", (signal_hash,))
-    result = c.fetchone()
-    conn.close()
-    
-    return result is not None
-
-def save_signal(signal):
-    """Save signal to database"""
-    if not signal['pair'] or not signal['entry']:
-        return False
-    
-    # Check for duplicates
-    if is_duplicate_signal(signal['pair'], signal['entry']):
-        logger.info(f"⚠️ DUPLICATE DETECTED: {signal['pair']} @ {signal['entry']}")
-        return False
-    
-    signal_hash = generate_signal_hash(signal['pair'], signal['entry'])
-    
-    conn = sqlite3.connect('signals.db')
-    c = conn.cursor()
-    
-    try:
-        c.execute('''INSERT INTO signals 
-                     (channel_name, pair, direction, entry, tp1, tp2, tp3, tp4, tp5, tp6, sl, leverage, timestamp, signal_hash, message_text)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                  (signal['channel'], signal['pair'], signal['direction'], signal['entry'],
-                   signal['tp1'], signal['tp2'], signal['tp3'], signal['tp4'], signal['tp5'], signal['tp6'],
-                   signal['sl'], signal['leverage'], signal['timestamp'], signal_hash, signal['raw_text']))
-        conn.commit()
-        logger.info(f"✅ SIGNAL SAVED: {signal['pair']} {signal['direction']} @ {signal['entry']} from {signal['channel']}")
-        return True
-    except sqlite3.IntegrityError:
-        logger.info(f"⚠️ DUPLICATE SIGNAL HASH: {signal['pair']}")
-        return False
-    finally:
-        conn.close()
-
-def get_db_connection():
-    conn = sqlite3.connect('signals.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def get_latest_signals(limit=50):
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('''SELECT * FROM signals ORDER BY rowid DESC LIMIT ?''', (limit,))
-        signals = c.fetchall()
-        conn.close()
-        return [dict(signal) for signal in signals]
-    except Exception as e:
-        logger.error(f"Error getting signals: {e}")
-        return []
-
-def get_security_logs(limit=20):
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('''SELECT * FROM security_logs ORDER BY rowid DESC LIMIT ?''', (limit,))
-        logs = c.fetchall()
-        conn.close()
-        return [dict(log) for log in logs]
-    except:
-        return []
-
-def get_stats():
-    try:
-        conn = get_db_connection()
-        c = conn.cursor()
-        
-        c.execute("SELECT COUNT(*) as total FROM signals")
-        total = c.fetchone()['total']
-        
-        c.execute("SELECT COUNT(*) as buy FROM signals WHERE direction = 'BUY'")
-        buy = c.fetchone()['buy']
-        
-        c.execute("SELECT COUNT(*) as sell FROM signals WHERE direction = 'SELL'")
-        sell = c.fetchone()['sell']
-        
-        c.execute("SELECT COUNT(*) as critical FROM security_logs WHERE severity = 'CRITICAL'")
-        critical_alerts = c.fetchone()['critical']
-        
-        conn.close()
-        
-        return {
-            'total_signals': total,
-            'buy_signals': buy,
-            'sell_signals': sell,
-            'critical_alerts': critical_alerts
-        }
-    except:
-        return {'total_signals': 0, 'buy_signals': 0, 'sell_signals': 0, 'critical_alerts': 0}
-
-async def send_telegram_notification(signal):
-    if not bot or not USER_ID:
-        return
-    try:
-        message = f"""
+# Shared signal pipeline
+from core import startup, ingest_post, ingest_edit
+from db import (query_signals, get_signals_after, get_max_signal_id, get_latest_ids,
+                get_security_logs, get_stats, writer_queue_depth, is_live_signal, signal_columns)
+from events import bus, SIGNAL_SAVED, SIGNAL_UPDATED, SECURITY_LOGGED
+from notifier import SignalNotifier
+from symbols import normalize_pair
+from api_cache import ResponseCache, make_etag
+from ingest import UpdateIngestor, REJECTED
+from sender import TelegramSender
+import metrics
+import profiler
+
+sender = TelegramSender(BOT_TOKEN) if BOT_TOKEN else None
+
+def format_signal_alert(signal):
+    return f"""
 🚨 NEW SIGNAL ALERT 🚨
 
 📍 Channel: {signal.get('channel_name', 'Unknown')}
@@ -278,131 +54,317 @@ TP3: {signal.get('tp3') or 'N/A'}
 
 ⏰ Time: {signal.get('timestamp', 'N/A')}
 """
-        await bot.send_message(chat_id=USER_ID, text=message)
-        logger.info(f"✅ Notification sent for {signal.get('pair')}")
-    except Exception as e:
-        logger.error(f"❌ Failed to send notification: {e}")
 
-def monitor_signals():
-    global last_notified_signal_id
+def notify_signal(signal):
+    """Send the alert for one saved signal row"""
+    if sender and USER_ID:
+        sender.notify(USER_ID, format_signal_alert(signal))
+
+def send_telegram_message(chat_id, text):
+    """Queue a Markdown message on the shared sender"""
+    if sender:
+        sender.send_message(chat_id, text, parse_mode='Markdown')
+
+def process_update(update_data):
+    """Parse and persist one webhook update; runs on an ingestion worker"""
+    # Handle direct messages to the bot
+    if 'message' in update_data:
+        message = update_data['message']
+        chat_id = message.get('chat', {}).get('id')
+        text = message.get('text', '')
+        
+        if text.startswith('/'):
+            # Handle bot commands
+            if text == '/start':
+                send_telegram_message(
+                    chat_id=chat_id,
+                    text="🤖 *Star-trader Bot is ACTIVE!*\n\n"
+                         "📊 I'm monitoring trading signals 24/7\n"
+                         "💱 Tracking: XAUUSD, BTC, EUR, GBP, and more\n"
+                         "📈 Dashboard: https://signal-trade-bot-5.onrender.com/\n\n"
+                         "✅ Bot Status: ONLINE\n\n"
+                         "Commands:\n"
+                         "/start - Show this message\n"
+                         "/stats - View signal statistics"
+                )
+                logger.info(f"✅ Responded to /start from chat {chat_id}")
+            elif text == '/stats':
+                stats = get_stats()
+                send_telegram_message(
+                    chat_id=chat_id,
+                    text=f"📊 *Signal Statistics*\n\n"
+                         f"Total Signals: {stats['total_signals']}\n"
+                         f"🟢 Buy Signals: {stats['buy_signals']}\n"
+                         f"🔴 Sell Signals: {stats['sell_signals']}\n"
+                         f"🚨 Critical Alerts: {stats['critical_alerts']}"
+                )
+                logger.info(f"✅ Sent stats to chat {chat_id}")
     
-    while True:
-        try:
-            conn = get_db_connection()
-            c = conn.cursor()
-            
-            c.execute("SELECT MAX(rowid) as max_id FROM signals")
-            result = c.fetchone()
-            max_id = result['max_id'] or 0
-            
-            if max_id > last_notified_signal_id:
-                c.execute("SELECT * FROM signals WHERE rowid = ?", (max_id,))
-                signal = c.fetchone()
-                
-                if signal and bot and USER_ID:
-                    asyncio.run(send_telegram_notification(dict(signal)))
-                    last_notified_signal_id = max_id
-            
-            conn.close()
-            time.sleep(5)
-            
-        except Exception as e:
-            logger.error(f"Error in monitoring: {e}")
-            time.sleep(10)
+    # Handle channel posts (existing code)
+    if 'channel_post' in update_data:
+        channel_post = update_data['channel_post']
+        channel_name = channel_post.get('chat', {}).get('title', 'Unknown')
+        message_text = channel_post.get('text', '')
+        
+        if message_text:
+            signal = ingest_post(message_text, channel_name,
+                                 channel_post.get('chat', {}).get('id'), channel_post.get('message_id'))
+            if signal:
+                logger.info(f"✅ Signal processed from webhook: {signal['pair']}")
+    
+    # Edits, e.g. TP/SL filled in after the post: update the stored signal
+    if 'edited_channel_post' in update_data:
+        channel_post = update_data['edited_channel_post']
+        channel_name = channel_post.get('chat', {}).get('title', 'Unknown')
+        message_text = channel_post.get('text', '')
+        
+        if message_text:
+            signal = ingest_edit(message_text, channel_name,
+                                 channel_post.get('chat', {}).get('id'), channel_post.get('message_id'))
+            if signal:
+                logger.info(f"✅ Signal processed from edited post: {signal['pair']}")
 
-# Helper function to send telegram messages synchronously
-def send_telegram_message_sync(chat_id, text):
-    """Send telegram message in a thread-safe way"""
-    try:
-        import requests
-        url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-        data = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "Markdown"
-        }
-        response = requests.post(url, json=data, timeout=10)
-        return response.status_code == 200
-    except Exception as e:
-        logger.error(f"Error sending message: {e}")
-        return False
+ingestor = UpdateIngestor(process_update)
+
+metrics.Gauge('signal_webhook_queue_depth', 'Webhook updates queued for the workers', ingestor.queue_depth)
+metrics.Gauge('signal_writer_queue_depth', 'Records waiting for the group-commit writer', writer_queue_depth)
+metrics.Gauge('signal_stream_subscribers', 'Open dashboard streams and other signal subscribers',
+              lambda: bus.subscriber_count(SIGNAL_SAVED))
 
 # WEBHOOK ENDPOINT - This is what was missing!
 @app.route('/webhook', methods=['POST'])
 def webhook():
-    """Handle incoming webhook updates from Telegram"""
+    """Validate and queue incoming webhook updates from Telegram"""
+    with metrics.WEBHOOK_ACK_SECONDS.time():
+        update_data = request.get_json(force=True, silent=True)
+        if not isinstance(update_data, dict) or not isinstance(update_data.get('update_id'), int):
+            logger.warning("⚠️ Ignoring malformed webhook update")
+            metrics.REJECTED.inc('malformed')
+            return jsonify({'ok': False, 'error': 'malformed update'}), 400
+
+        outcome = ingestor.submit(update_data)
+        if outcome == REJECTED:
+            # Telegram retries later; until then the workers catch up
+            logger.warning(f"⚠️ Webhook queue full, deferring update {update_data['update_id']}")
+            metrics.REJECTED.inc('busy')
+            return jsonify({'ok': False, 'error': 'busy'}), 503, {'Retry-After': '1'}
+        return jsonify({'ok': True}), 200
+
+# Live dashboard feed
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_QUEUE_SIZE = 100
+DASHBOARD_FIELDS = ['id', 'channel_name', 'pair', 'direction', 'entry', 'sl', 'tp1', 'tp2', 'timestamp']
+
+def compact_signal(signal):
+    """Only the fields the dashboard renders"""
+    return {field: signal.get(field) for field in DASHBOARD_FIELDS}
+
+def signal_stats_delta(signal):
+    delta = {'total_signals': 1}
+    if signal.get('direction') == 'BUY':
+        delta['buy_signals'] = 1
+    elif signal.get('direction') == 'SELL':
+        delta['sell_signals'] = 1
+    return delta
+
+def edit_stats_delta(signal):
+    """Counter moves of an edit that flipped the direction (empty otherwise)"""
+    delta = {}
+    for direction, step in ((signal['previous_direction'], -1), (signal['direction'], 1)):
+        if direction in ('BUY', 'SELL'):
+            key = f'{direction.lower()}_signals'
+            delta[key] = delta.get(key, 0) + step
+    return {key: step for key, step in delta.items() if step}
+
+def sse_message(event, data, event_id=None):
+    message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\n{message}" if event_id is not None else message
+
+def stream_events(last_id):
+    """Yield SSE messages for every signal after last_id, then live ones
+
+    Edits made in this process come as 'signal_update' events for the card
+    with that id; the Bot.py worker's edits only show on the next reload.
+    """
+    events = bus.subscribe(SIGNAL_SAVED, SIGNAL_UPDATED, SECURITY_LOGGED, maxsize=STREAM_QUEUE_SIZE)
+    
+    def catch_up():
+        # Rows this process never published: the Bot.py worker's, or events dropped on a full queue
+        nonlocal last_id
+        while True:
+            rows = get_signals_after(last_id, 100)
+            for row in rows:
+                last_id = row['id']
+                if is_live_signal(row):
+                    yield sse_message('signal', compact_signal(row), row['id'])
+                    yield sse_message('stats', signal_stats_delta(row))
+                else:
+                    # Backfilled history: count it, but move the client's Last-Event-ID past it
+                    yield sse_message('stats', signal_stats_delta(row), row['id'])
+            if len(rows) < 100:
+                return
+    
     try:
-        update_data = request.get_json(force=True)
-        logger.info(f"📨 Received webhook update")
-        
-        # Handle direct messages to the bot
-        if 'message' in update_data:
-            message = update_data['message']
-            chat_id = message.get('chat', {}).get('id')
-            text = message.get('text', '')
+        yield "retry: 3000\n\n"
+        yield from catch_up()
+        while True:
+            try:
+                topic, event = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield from catch_up()
+                yield ": keepalive\n\n"
+                continue
             
-            if text.startswith('/'):
-                # Handle bot commands
-                if text == '/start':
-                    send_telegram_message_sync(
-                        chat_id=chat_id,
-                        text="🤖 *Star-trader Bot is ACTIVE!*\n\n"
-                             "📊 I'm monitoring trading signals 24/7\n"
-                             "💱 Tracking: XAUUSD, BTC, EUR, GBP, and more\n"
-                             "📈 Dashboard: https://signal-trade-bot-5.onrender.com/\n\n"
-                             "✅ Bot Status: ONLINE\n\n"
-                             "Commands:\n"
-                             "/start - Show this message\n"
-                             "/stats - View signal statistics"
-                    )
-                    logger.info(f"✅ Responded to /start from chat {chat_id}")
-                elif text == '/stats':
-                    stats = get_stats()
-                    send_telegram_message_sync(
-                        chat_id=chat_id,
-                        text=f"📊 *Signal Statistics*\n\n"
-                             f"Total Signals: {stats['total_signals']}\n"
-                             f"🟢 Buy Signals: {stats['buy_signals']}\n"
-                             f"🔴 Sell Signals: {stats['sell_signals']}\n"
-                             f"🚨 Critical Alerts: {stats['critical_alerts']}"
-                    )
-                    logger.info(f"✅ Sent stats to chat {chat_id}")
-        
-        # Handle channel posts (existing code)
-        if 'channel_post' in update_data:
-            channel_post = update_data['channel_post']
-            channel_name = channel_post.get('chat', {}).get('title', 'Unknown')
-            message_text = channel_post.get('text', '')
-            
-            if message_text:
-                # Check for signal keywords
-                signal_keywords = ['BUY', 'SELL', 'LONG', 'SHORT', 'TP', 'SL', 'ENTRY', 'XAUUSD', 'GOLD', 'BTC']
-                if any(keyword in message_text.upper() for keyword in signal_keywords):
-                    signal = parse_signal(message_text, channel_name)
-                    
-                    if signal['pair'] and (signal['entry'] or signal['tp1']):
-                        if save_signal(signal):
-                            logger.info(f"✅ Signal processed from webhook: {signal['pair']}")
-        
-        return jsonify({'ok': True}), 200
-    except Exception as e:
-        logger.error(f"❌ Webhook error: {e}")
-        return jsonify({'ok': False, 'error': str(e)}), 500
+            if topic == SECURITY_LOGGED:
+                if event['severity'] == 'CRITICAL':
+                    yield sse_message('stats', {'critical_alerts': 1})
+            elif topic == SIGNAL_UPDATED:
+                if event['id'] <= last_id:
+                    yield sse_message('signal_update', compact_signal(event))
+                    delta = edit_stats_delta(event)
+                    if delta:
+                        yield sse_message('stats', delta)
+            elif event['id'] > last_id + 1:
+                yield from catch_up()
+            elif event['id'] == last_id + 1:
+                last_id = event['id']
+                yield sse_message('signal', compact_signal(event), event['id'])
+                yield sse_message('stats', signal_stats_delta(event))
+    finally:
+        bus.unsubscribe(events)
+
+@app.route('/api/stream', methods=['GET'])
+def api_stream():
+    """Server-Sent Events feed of new signals and stat deltas"""
+    since_id = request.headers.get('Last-Event-ID') or request.args.get('since_id', '')
+    last_id = int(since_id) if since_id.isdigit() else get_max_signal_id()
+    return Response(stream_events(last_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+response_cache = ResponseCache(get_latest_ids)
+
+def cached_json(build):
+    """Serve build()'s JSON from the response cache, or 304 if the client is current"""
+    version = response_cache.version()
+    etag = make_etag(version)
+    last_modified = datetime.fromtimestamp(response_cache.last_modified, timezone.utc)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since:
+        # last_modified is already whole seconds (see ResponseCache.version)
+        not_modified = last_modified <= request.if_modified_since
+    else:
+        not_modified = False
+
+    headers = {
+        # Weak: the same data is served plain or gzip-encoded
+        'ETag': quote_etag(etag, weak=True),
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    key = request.full_path
+    entry = response_cache.get(key, version)
+    if entry is None:
+        entry = response_cache.put(key, version, build())
+    _, body, gzipped = entry
+
+    if gzipped is not None and request.accept_encodings['gzip']:
+        headers['Content-Encoding'] = 'gzip'
+        body = gzipped
+    return Response(body, mimetype='application/json', headers=headers)
+
+SIGNAL_FILTERS = {'pair': 'pair', 'channel': 'channel_name', 'direction': 'direction'}
+MAX_PAGE_SIZE = 500
+
+def parse_time(value):
+    """Epoch seconds or an ISO 8601 date/time (UTC unless it has an offset)"""
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def signal_query(args):
+    """query_signals keyword arguments from /api/signals query parameters"""
+    query = {'filters': {}}
+    for param, column in SIGNAL_FILTERS.items():
+        if args.get(param):
+            value = args[param]
+            if param == 'pair':
+                # ?pair=gold finds the XAUUSD rows
+                value = normalize_pair(value)
+            query['filters'][column] = value if param == 'channel' else value.upper()
+    columns = signal_columns()
+    for param in ('start', 'end'):
+        if args.get(param):
+            if 'created_at' not in columns:
+                raise ValueError(f"{param} needs a migrated database (run migrate.py)")
+            query[param] = parse_time(args[param])
+    for param in ('before_id', 'since_id'):
+        if args.get(param):
+            query[param] = int(args[param])
+    query['limit'] = max(1, min(int(args.get('limit', 50)), MAX_PAGE_SIZE))
+    if args.get('fields'):
+        fields = args['fields'].split(',')
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+        # Clients page with the last id they got
+        query['fields'] = ['id'] + [field for field in fields if field != 'id']
+    elif 'since_id' in query:
+        # Cheap poll for clients that cannot stream
+        query['fields'] = DASHBOARD_FIELDS
+    return query
 
 @app.route('/api/signals', methods=['GET'])
 def api_signals():
-    signals = get_latest_signals()
-    return jsonify(signals)
+    """Newest signals first; page back with before_id=<last id>
+
+    Filters: pair, channel, direction, start/end (epoch seconds or ISO 8601).
+    fields=id,pair,... limits the columns returned; limit caps the page size.
+    """
+    try:
+        query = signal_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return cached_json(lambda: query_signals(**query))
 
 @app.route('/api/stats', methods=['GET'])
 def api_stats():
-    stats = get_stats()
-    return jsonify(stats)
+    breakdown = request.args.get('breakdown') == '1'
+    return cached_json(lambda: get_stats(breakdown=breakdown))
 
 @app.route('/api/security-logs', methods=['GET'])
 def api_security_logs():
-    logs = get_security_logs()
-    return jsonify(logs)
+    return cached_json(get_security_logs)
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/profile', methods=['POST'])
+def api_profile():
+    """Sample all threads for ?seconds=N and return the collapsed stacks (needs PROFILE_TOKEN)"""
+    if not profiler.PROFILE_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {profiler.PROFILE_TOKEN}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        seconds = float(request.args.get('seconds', profiler.PROFILE_SECONDS))
+    except ValueError:
+        return jsonify({'error': 'seconds must be a number'}), 400
+    path = profiler.profile_to_file(max(seconds, 0.1), 'server')
+    if path is None:
+        return jsonify({'error': 'A profile is already running'}), 409
+    with open(path) as f:
+        return Response(f.read(), content_type='text/plain; charset=utf-8')
 
 @app.route('/api/health', methods=['GET'])
 def api_health():
@@ -410,7 +372,9 @@ def api_health():
         'status': 'online',
         'timestamp': datetime.now().isoformat(),
         'bot_token_set': bool(BOT_TOKEN),
-        'user_id_set': bool(USER_ID)
+        'user_id_set': bool(USER_ID),
+        'ingest': ingestor.stats(),
+        'writer_queue_depth': writer_queue_depth()
     })
 
 @app.route('/', methods=['GET'])
@@ -529,71 +493,138 @@ def index():
     </div>
 
     <script>
+        const MAX_CARDS = 20;
+        const CARD_FIELDS = 'channel_name,pair,direction,entry,sl,tp1,tp2,timestamp';
+        let signals = [];
+        let stats = {};
+        let lastId = 0;
+
+        function renderStats() {
+            document.getElementById('totalSignals').textContent = stats.total_signals || 0;
+            document.getElementById('buySignals').textContent = stats.buy_signals || 0;
+            document.getElementById('sellSignals').textContent = stats.sell_signals || 0;
+            document.getElementById('alertsCount').textContent = stats.critical_alerts || 0;
+        }
+
+        function renderSignals() {
+            const container = document.getElementById('signalsContainer');
+            if (!signals || signals.length === 0) {
+                container.innerHTML = '<div class="empty">📡 Waiting for signals...</div>';
+                return;
+            }
+
+            container.innerHTML = signals.slice(0, MAX_CARDS).map(signal => `
+                <div class="signal-card ${(signal.direction || '').toLowerCase()}">
+                    <div class="signal-header">
+                        <div class="signal-pair">${signal.pair || 'N/A'}</div>
+                        <div class="signal-direction ${(signal.direction || '').toLowerCase()}">
+                            ${signal.direction || 'N/A'}
+                        </div>
+                    </div>
+                    <div class="signal-meta">
+                        ⏰ ${signal.timestamp || 'N/A'} | 📍 ${signal.channel_name || 'N/A'}
+                    </div>
+                    <div class="signal-details">
+                        <div class="detail-item">
+                            <div class="detail-label">ENTRY</div>
+                            <div class="detail-value">${signal.entry || 'N/A'}</div>
+                        </div>
+                        <div class="detail-item">
+                            <div class="detail-label">STOP LOSS</div>
+                            <div class="detail-value">${signal.sl || 'N/A'}</div>
+                        </div>
+                        ${signal.tp1 ? `<div class="detail-item">
+                            <div class="detail-label">TP1</div>
+                            <div class="detail-value">${signal.tp1}</div>
+                        </div>` : ''}
+                        ${signal.tp2 ? `<div class="detail-item">
+                            <div class="detail-label">TP2</div>
+                            <div class="detail-value">${signal.tp2}</div>
+                        </div>` : ''}
+                    </div>
+                </div>
+            `).join('');
+        }
+
+        function addSignals(newSignals) {
+            newSignals
+                .filter(signal => signal.id > lastId)
+                .sort((a, b) => a.id - b.id)
+                .forEach(signal => {
+                    signals.unshift(signal);
+                    lastId = signal.id;
+                });
+            signals = signals.slice(0, MAX_CARDS);
+            renderSignals();
+        }
+
         async function loadData() {
             try {
                 const [signalsRes, statsRes] = await Promise.all([
-                    fetch('/api/signals'),
+                    fetch('/api/signals?limit=' + MAX_CARDS + '&fields=' + CARD_FIELDS),
                     fetch('/api/stats')
                 ]);
-                const signals = await signalsRes.json();
-                const stats = await statsRes.json();
-
-                document.getElementById('totalSignals').textContent = stats.total_signals || 0;
-                document.getElementById('buySignals').textContent = stats.buy_signals || 0;
-                document.getElementById('sellSignals').textContent = stats.sell_signals || 0;
-                document.getElementById('alertsCount').textContent = stats.critical_alerts || 0;
-
-                const container = document.getElementById('signalsContainer');
-                if (!signals || signals.length === 0) {
-                    container.innerHTML = '<div class="empty">📡 Waiting for signals...</div>';
-                    return;
-                }
+                signals = (await signalsRes.json()).slice(0, MAX_CARDS);
+                stats = await statsRes.json();
+                lastId = signals.reduce((max, signal) => Math.max(max, signal.id || 0), 0);
+                renderStats();
+                renderSignals();
+            } catch (e) {
+                console.error('Error:', e);
+            }
+        }
 
-                container.innerHTML = signals.slice(0, 20).map(signal => `
-                    <div class="signal-card ${(signal.direction || '').toLowerCase()}">
-                        <div class="signal-header">
-                            <div class="signal-pair">${signal.pair || 'N/A'}</div>
-                            <div class="signal-direction ${(signal.direction || '').toLowerCase()}">
-                                ${signal.direction || 'N/A'}
-                            </div>
-                        </div>
-                        <div class="signal-meta">
-                            ⏰ ${signal.timestamp || 'N/A'} | 📍 ${signal.channel_name || 'N/A'}
-                        </div>
-                        <div class="signal-details">
-                            <div class="detail-item">
-                                <div class="detail-label">ENTRY</div>
-                                <div class="detail-value">${signal.entry || 'N/A'}</div>
-                            </div>
-                            <div class="detail-item">
-                                <div class="detail-label">STOP LOSS</div>
-                                <div class="detail-value">${signal.sl || 'N/A'}</div>
-                            </div>
-                            ${signal.tp1 ? `<div class="detail-item">
-                                <div class="detail-label">TP1</div>
-                                <div class="detail-value">${signal.tp1}</div>
-                            </div>` : ''}
-                            ${signal.tp2 ? `<div class="detail-item">
-                                <div class="detail-label">TP2</div>
-                                <div class="detail-value">${signal.tp2}</div>
-                            </div>` : ''}
-                        </div>
-                    </div>
-                `).join('');
+        // Fallback for browsers or proxies that cannot stream
+        async function poll() {
+            try {
+                const [signalsRes, statsRes] = await Promise.all([
+                    fetch('/api/signals?since_id=' + lastId),
+                    fetch('/api/stats')
+                ]);
+                addSignals(await signalsRes.json());
+                stats = await statsRes.json();
+                renderStats();
             } catch (e) {
                 console.error('Error:', e);
             }
         }
 
-        loadData();
-        setInterval(loadData, 5000);
+        function startPolling() {
+            setInterval(poll, 5000);
+        }
+
+        function startStream() {
+            if (!window.EventSource) {
+                startPolling();
+                return;
+            }
+            const source = new EventSource('/api/stream?since_id=' + lastId);
+            source.addEventListener('signal', e => addSignals([JSON.parse(e.data)]));
+            source.addEventListener('signal_update', e => {
+                const update = JSON.parse(e.data);
+                signals = signals.map(signal => signal.id === update.id ? Object.assign(signal, update) : signal);
+                renderSignals();
+            });
+            source.addEventListener('stats', e => {
+                const delta = JSON.parse(e.data);
+                Object.keys(delta).forEach(key => { stats[key] = (stats[key] || 0) + delta[key]; });
+                renderStats();
+            });
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    startPolling();
+                }
+            };
+        }
+
+        loadData().then(startStream);
     </script>
 </body>
 </html>'''
 
 def main():
     # Initialize database first
-    init_db()
+    startup()
     
     if not BOT_TOKEN:
         logger.warning("⚠️ WARNING: TELEGRAM_BOT_TOKEN not set!")
@@ -602,9 +633,19 @@ def main():
         logger.warning("⚠️ WARNING: TELEGRAM_USER_ID not set!")
     
     if BOT_TOKEN and USER_ID:
-        signal_monitor_thread = threading.Thread(target=monitor_signals, daemon=True)
-        signal_monitor_thread.start()
-        logger.info("📊 Signal monitor thread started")
+        notifier = SignalNotifier(notify_signal)
+        notifier.start()
+        metrics.Gauge('signal_notifier_backlog', 'Saved signals waiting for the notifier', notifier.backlog)
+    if sender:
+        atexit.register(sender.close)
+
+    # Stopped before the writer (atexit is LIFO) so queued updates get saved
+    ingestor.start()
+    atexit.register(ingestor.stop)
+    
+    # Exit through atexit on SIGTERM so queued writes get flushed
+    os_signal.signal(os_signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    profiler.install_signal_handler('server')
     
     logger.info("🚀 SIGNAL TRADE SERVER STARTING...")
     logger.info(f"🔗 Webhook URL: https://signal-trade-bot-5.onrender.com/webhook")
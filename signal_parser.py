@@ -0,0 +1,115 @@
+import re
+import time
+from datetime import datetime
+
+from symbols import resolve_symbol
+
+# Signal grammar
+#
+# Every field pattern starts with a literal keyword, so instead of running one
+# regex per pattern over the whole message, a single scan finds each keyword
+# occurrence and only the patterns anchored on that keyword are tried there.
+# The per-field priority order below then picks the same value the old
+# one-search-per-pattern code did.
+
+# (field, anchor keyword, pattern) in priority order. For entry, SL and
+# leverage the first pattern that matches anywhere in the text wins; for take
+# profits every match is applied in order, later ones overwriting earlier ones.
+FIELD_PATTERNS = [
+    ('entry', 'ENTRY', r'ENTRY[:\s@-]*([0-9.]+)'),
+    ('entry', 'ENTER', r'ENTER[:\s@]*([0-9.]+)'),
+    ('entry', 'ENTRY', r'ENTRY PRICE[:\s]*([0-9.]+)'),
+    ('entry', 'ENTRY', r'ENTRY ZONE[:\s]*([0-9.-]+)'),
+    ('entry', 'BUY', r'BUY[:\s@]*([0-9.]+)'),
+    ('entry', 'SELL', r'SELL[:\s@]*([0-9.]+)'),
+    ('entry', '@', r'@ ?([0-9.]+)'),
+    ('tp', 'TP', r'TP[:\s]*?([1-6])[:\s-]*([0-9.]+)'),
+    ('tp', 'TAKE PROFIT', r'TAKE PROFIT[:\s]*?([1-6])[:\s-]*([0-9.]+)'),
+    ('tp', 'TARGET', r'TARGET[:\s]*?([1-6])[:\s-]*([0-9.]+)'),
+    ('sl', 'SL', r'SL[:\s@-]*([0-9.]+)'),
+    ('sl', 'STOP', r'STOP LOSS[:\s@-]*([0-9.]+)'),
+    ('sl', 'STOP', r'STOPLOSS[:\s@]*([0-9.]+)'),
+    ('leverage', 'LEVERAGE', r'LEVERAGE[:\s]*X?([0-9.]+)'),
+    ('leverage', 'CROSS', r'CROSS[:\s]*X?([0-9.]+)'),
+    ('leverage', 'X', r'X([0-9.]+)'),
+]
+
+# Anchor keyword -> [(field, priority, compiled pattern)]
+_ANCHORED = {}
+for _priority, (_field, _anchor, _pattern) in enumerate(FIELD_PATTERNS):
+    _ANCHORED.setdefault(_anchor, []).append((_field, _priority, re.compile(_pattern)))
+
+# Zero-width so keyword occurrences that overlap are all reported
+KEYWORD_SCANNER = re.compile('(?=(' + '|'.join(
+    re.escape(anchor) for anchor in sorted(_ANCHORED, key=len, reverse=True)
+) + '))')
+
+
+# Formatting the clock costs more than parsing a short message, and both
+# strings only change once a minute: (minute, 'HH:MM', 'DD MONTH YYYY')
+_clock = (None, None, None)
+
+
+def _current_timestamp():
+    global _clock
+    minute = int(time.time() // 60)
+    if minute != _clock[0]:
+        now = datetime.now()
+        _clock = (minute, now.strftime('%H:%M'), now.strftime('%d %B %Y').upper())
+    return _clock[1], _clock[2]
+
+
+def parse_signal(text, channel_name):
+    """Parse trading signal from message text"""
+    text = text.upper()
+    timestamp, date = _current_timestamp()
+    signal = {
+        'channel': channel_name,
+        'pair': None,
+        'direction': None,
+        'entry': None,
+        'tp1': None, 'tp2': None, 'tp3': None, 'tp4': None, 'tp5': None, 'tp6': None,
+        'sl': None,
+        'leverage': None,
+        'timestamp': timestamp,
+        'date': date,
+        'raw_text': text
+    }
+
+    # Extract trading pair, in its canonical spelling (see symbols.py)
+    signal['pair'] = resolve_symbol(text)
+
+    # Extract direction
+    if 'BUY' in text or 'LONG' in text:
+        signal['direction'] = 'BUY'
+    elif 'SELL' in text or 'SHORT' in text:
+        signal['direction'] = 'SELL'
+
+    # Single pass over the text for entry, TPs, SL and leverage
+    best = {}
+    tps = []
+    tp_end = {}
+    for keyword in KEYWORD_SCANNER.finditer(text):
+        pos = keyword.start()
+        for field, priority, pattern in _ANCHORED[keyword.group(1)]:
+            if field == 'tp':
+                # Keep findall() semantics: matches of one pattern never overlap
+                if pos < tp_end.get(priority, 0):
+                    continue
+                match = pattern.match(text, pos)
+                if match:
+                    tp_end[priority] = match.end()
+                    tps.append((priority, match.group(1), match.group(2)))
+            elif field not in best or priority < best[field][0]:
+                match = pattern.match(text, pos)
+                if match:
+                    best[field] = (priority, match.group(1))
+
+    for field, (_, value) in best.items():
+        signal[field] = value
+
+    # Earlier TP patterns are applied first so later ones overwrite them
+    for _, tp_num, value in sorted(tps, key=lambda tp: tp[0]):
+        signal[f'tp{tp_num}'] = value
+
+    return signal
@@ -0,0 +1,193 @@
+"""Instrument symbol resolver used by parse_signal
+
+Every known symbol and alias, also written base/quote with '/', '-', '_' or
+a space ("WOO/USDT", "EUR USD"), is compiled into one regex shaped like a
+character trie, so finding the instrument is a single C-level scan that
+shares the work of common prefixes, followed by one dict lookup for its
+canonical symbol. Matches only ever cover whole tokens, so "ID" inside
+"VALID" is not a pair, and the first instrument named in the message wins.
+
+Every spelling resolves to one canonical symbol (GOLD, XAU/USD and XAUUSD
+are all XAUUSD; a bare crypto base like SUSHI is SUSHIUSDT), so stats and
+dedupe group them together; a crypto base quoted in USD, USDC or BUSD
+(BTCUSD, BTC/USD) is its USDT pair too. Tokens that are not in the table but
+look like a USD-quoted ticker (three or more letters followed by USD, USDT,
+USDC or BUSD), or a known base quoted in BTC, ETH or a fiat currency
+(ETHBTC, XAUEUR), are taken as they are.
+
+Aliases that are also everyday words or abbreviations are strict: they only
+count when prefixed with $ or #, or written with their quote (ID/USDT).
+
+The built-in table can be extended or overridden with a JSON file
+(INSTRUMENTS_FILE, default instruments.json) loaded once at startup:
+
+    {
+        "instruments": [
+            {"symbol": "XAUUSD", "class": "metal", "aliases": ["GOLD", "XAU"]},
+            {"symbol": "PYTHUSDT", "class": "crypto", "aliases": ["PYTH"]},
+            {"symbol": "IDUSDT", "class": "crypto", "aliases": ["ID"], "strict": true}
+        ]
+    }
+"""
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTS_FILE = os.getenv('INSTRUMENTS_FILE', 'instruments.json')
+
+CURRENCIES = ['EUR', 'GBP', 'AUD', 'NZD', 'USD', 'CAD', 'CHF', 'JPY']
+METALS = {'XAUUSD': ['GOLD', 'XAU'], 'XAGUSD': ['SILVER', 'XAG']}
+INDICES = {'US30': ['DOW', 'DJ30', 'DJI', 'WS30'], 'NAS100': ['USTEC', 'NASDAQ', 'NQ100'],
+           'SPX500': ['US500', 'SP500', 'SPX'], 'GER40': ['DAX', 'DE40', 'GER30']}
+CRYPTO = ['BTC', 'ETH', 'SOL', 'XRP', 'BNB', 'ADA', 'DOGE', 'AVAX', 'DOT', 'LINK', 'MATIC', 'LTC', 'TRX', 'SHIB',
+          'ARB', 'APT', 'SUI', 'PEPE', 'INJ', 'FIL', 'ATOM', 'WOO', 'STORJ', 'GAS', 'SUSHI', 'ICP', 'CYBER', 'ID',
+          'OP', 'NEAR', 'TON']
+# Bases that are also everyday words ("join the LINK", "GAS prices")
+STRICT_CRYPTO = {'DOT', 'ID', 'OP', 'NEAR', 'TON', 'LINK', 'SOL', 'GAS', 'ATOM', 'APT'}
+QUOTES = ('USDT', 'USDC', 'BUSD', 'USD')
+# Quotes of crosses outside the table (ETHBTC, XAUEUR), taken after a known base
+CROSS_QUOTES = ('BTC', 'ETH') + tuple(CURRENCIES)
+
+_STRIP = re.compile(r'[/\-_ $#]')
+_JOIN = '\0'
+
+
+def _trie_pattern(words):
+    """Regex alternation shaped like a character trie of words, trying longer words first"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node):
+        branches = []
+        for char, child in sorted(node.items()):
+            if char:
+                branches.append(('[/\\-_ ]' if char == _JOIN else re.escape(char)) + pattern(child))
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if '' in node else '')
+
+    return pattern(trie)
+
+
+def default_instruments():
+    instruments = [{'symbol': base + quote, 'class': 'forex'}
+                   for base in CURRENCIES for quote in CURRENCIES if base != quote]
+    instruments += [{'symbol': symbol, 'class': 'metal', 'aliases': aliases} for symbol, aliases in METALS.items()]
+    instruments += [{'symbol': symbol, 'class': 'index', 'aliases': aliases} for symbol, aliases in INDICES.items()]
+    instruments += [{'symbol': base + 'USDT', 'class': 'crypto', 'aliases': [base], 'strict': base in STRICT_CRYPTO}
+                    for base in CRYPTO]
+    return instruments
+
+
+class SymbolResolver:
+    """Finds and canonicalizes the instrument named in a message"""
+
+    def __init__(self, instruments):
+        # spelling without separators -> (canonical symbol, strict)
+        self.names = {}
+        self.classes = {}
+        for instrument in instruments:
+            symbol = _STRIP.sub('', instrument['symbol'].upper())
+            self.classes[symbol] = instrument.get('class')
+            self.names[symbol] = (symbol, False)
+            strict = instrument.get('strict', False)
+            for alias in instrument.get('aliases', ()):
+                self.names[_STRIP.sub('', alias.upper())] = (symbol, strict)
+        # BTCUSD, BTCUSDC and BTCBUSD are BTCUSDT
+        for symbol, asset_class in self.classes.items():
+            if asset_class == 'crypto' and symbol.endswith('USDT'):
+                for quote in ('USD', 'USDC', 'BUSD'):
+                    self.names.setdefault(symbol[:-4] + quote, (symbol, False))
+
+        # Every spelling, plus base/quote spellings with a separator ("EUR/USD", "BTC USDT")
+        quotes = set(CURRENCIES) | set(QUOTES)
+        spellings = set(self.names)
+        for name in self.names:
+            spellings.update(name[:i] + _JOIN + name[i:] for i in range(2, len(name) - 2) if name[i:] in quotes)
+        # Bases a cross outside the table can start with: currencies, metals, crypto
+        bases = set(CURRENCIES) | {name[:-3] for name, (symbol, _) in self.names.items()
+                                   if self.classes.get(symbol) == 'metal' and name.endswith('USD')}
+        bases |= {symbol[:-4] for symbol, asset_class in self.classes.items()
+                  if asset_class == 'crypto' and symbol.endswith('USDT')}
+        # Known spellings first, then any other USD-quoted ticker or cross; whole
+        # tokens only, and "XAU" in "XAU/EUR" is not a token of its own
+        self.pattern = re.compile(
+            r'(?<![A-Z0-9])(?:' + _trie_pattern(spellings) +
+            r'|[A-Z]{3,}[/\-_]?(?:' + '|'.join(QUOTES) + r')' +
+            r'|' + _trie_pattern(bases) + r'[/\-_]?(?:' + '|'.join(CROSS_QUOTES) + r'))' +
+            r'(?![A-Z0-9]|[/\-_](?:' + '|'.join(sorted(set(CROSS_QUOTES) | {'USD'})) + r'))'
+        )
+
+    def resolve(self, text):
+        """Canonical symbol of the first instrument in upper-cased text, or None"""
+        names = self.names
+        match = self.pattern.search(text)
+        while match:
+            spelling = match.group()
+            found = names.get(spelling)
+            if found is None:
+                spelling = _STRIP.sub('', spelling)
+                found = names.get(spelling)
+                if found is None:
+                    return spelling
+            # Strict aliases only count as $ID or #ID
+            if not found[1] or text[match.start() - 1:match.start()] in ('$', '#'):
+                return found[0]
+            match = self.pattern.search(text, match.end())
+        return None
+
+    def normalize(self, pair):
+        """Canonical form of a stored or fed pair name; unknown names lose their separators"""
+        if not pair:
+            return pair
+        name = _STRIP.sub('', pair.upper())
+        # A pair field names an instrument, so strict aliases count here
+        found = self.names.get(name)
+        return found[0] if found else name
+
+    def asset_class(self, symbol):
+        return self.classes.get(symbol)
+
+
+# Built on first use: compiling the pattern is the costly part of importing this module
+_resolver = None
+
+
+def get_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = SymbolResolver(default_instruments())
+    return _resolver
+
+
+def load_instruments(path=INSTRUMENTS_FILE):
+    """Extend the built-in table with the instruments in path; call once at startup"""
+    global _resolver
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        extra = json.load(f).get('instruments', [])
+    _resolver = SymbolResolver(default_instruments() + extra)
+    logger.info(f"✅ Loaded {len(extra)} instruments from {path}")
+
+
+def resolve_symbol(text):
+    """Canonical symbol of the first instrument named in upper-cased text, or None"""
+    return (_resolver or get_resolver()).resolve(text)
+
+
+def normalize_pair(pair):
+    return (_resolver or get_resolver()).normalize(pair)
+
+
+def asset_class(symbol):
+    return (_resolver or get_resolver()).asset_class(symbol)
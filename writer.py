@@ -0,0 +1,124 @@
+"""Background group-commit writer for signal and security-log inserts
+
+Callers put records on a queue and a single writer thread commits them in
+batches, bounded by MAX_BATCH records or MAX_LATENCY seconds after the first
+record of the batch arrived, whichever comes first. A burst of cross-posted
+signals then costs one fsync instead of one per row.
+
+Every record gets a Future that resolves to the new rowid, or to None when a
+unique record hit a constraint (a signal_hash that was already stored), so
+callers can still react to duplicates. An optional on_commit callback runs on
+the writer thread, in commit order, once the row is durable.
+"""
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = int(os.getenv('WRITER_MAX_BATCH', '256'))
+MAX_LATENCY = float(os.getenv('WRITER_MAX_LATENCY_MS', '20')) / 1000
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Single writer thread that batches INSERTs into one transaction"""
+
+    def __init__(self, connection, max_batch=MAX_BATCH, max_latency=MAX_LATENCY):
+        self._connection = connection
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+            self._thread.start()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, sql, params, unique=False, on_commit=None):
+        """Queue one INSERT; with unique=True a constraint hit resolves to None"""
+        future = Future()
+        record = (sql, params, unique, on_commit, future)
+        with self._lock:
+            if not self._stopped:
+                self._start()
+                self._queue.put(record)
+                return future
+        # Shutting down: nobody is left to batch with, write it now
+        self._commit([record])
+        return future
+
+    def stop(self, timeout=10):
+        """Flush everything queued so far and stop the writer thread"""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error(f"❌ Writer did not flush within {timeout}s, {self._queue.qsize()} records pending")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            if record is _STOP:
+                return
+
+            batch = [record]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    record = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            self._commit(batch)
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with metrics.DB_COMMIT_SECONDS.time(), self._connection() as conn:
+                for sql, params, unique, _, _ in batch:
+                    try:
+                        results.append(conn.execute(sql, params).lastrowid)
+                    except sqlite3.IntegrityError as e:
+                        # Only this statement is rolled back, the batch goes on
+                        results.append(None if unique else e)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Group commit of {len(batch)} records failed: {e}")
+            for _, _, _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, _, _, on_commit, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                continue
+            if on_commit is not None and result is not None:
+                try:
+                    on_commit(result)
+                except Exception as e:
+                    logger.error(f"❌ on_commit callback failed: {e}")
+            future.set_result(result)